@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Andi Albrecht, albrecht.andi@gmail.com
+#
+# This benchmark is part of python-sqlparse and is released under
+# the BSD License: http://www.opensource.org/licenses/bsd-license.php
+#
+# Parses a query log with many repeated statements with and without
+# dedup and prints the times and the statistics of the statement cache.
+
+import time
+
+import sqlparse
+from sqlparse import engine
+
+STATEMENTS = 10000
+DISTINCT = 50
+
+
+def main():
+    sql = u''.join(
+        u'select a, b from t where id = {0} order by a;\n'
+        u"insert into log (id, msg) values ({0}, 'x');\n".format(
+            i % DISTINCT) for i in range(STATEMENTS // 2))
+
+    for name, dedup in [('parse', None), ('dedup', True),
+                        ('dedup, copies', engine.StatementCache(copy=True))]:
+        start = time.time()
+        sqlparse.parse(sql, dedup=dedup)
+        print('{0:16s} {1:8.2f}s'.format(name, time.time() - start))
+    print(dedup.cache_info())
+
+
+if __name__ == '__main__':
+    main()
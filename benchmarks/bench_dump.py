@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Andi Albrecht, albrecht.andi@gmail.com
+#
+# This benchmark is part of python-sqlparse and is released under
+# the BSD License: http://www.opensource.org/licenses/bsd-license.php
+#
+# Splits a pg_dump-like script with large COPY blocks with and without
+# the "copy" dump mode of the lexer and prints the times.
+
+import io
+import time
+
+import sqlparse
+from sqlparse import engine
+from sqlparse.lexer import Lexer
+
+ROWS = 200000
+
+
+def main():
+    rows = u''.join(u"{0}\tname {0}; it''s\t\\N\n".format(i)
+                    for i in range(ROWS))
+    sql = (u'CREATE TABLE t (a int, b text, c text);\n'
+           u'COPY t (a, b, c) FROM stdin;\n' + rows + u'\\.\n\n') * 3
+    data = sql.encode('utf-8')
+    print('{0:.1f} MB'.format(len(data) / 1e6))
+
+    start = time.time()
+    count = len(sqlparse.split(sql))
+    print('{0:24s} {1:8.2f}s {2:8d} statements'.format(
+        'split', time.time() - start, count))
+
+    lexer = Lexer('postgresql', dump_modes=['copy'])
+    start = time.time()
+    count = len(engine.split_offsets(sql, lexer))
+    print('{0:24s} {1:8.2f}s {2:8d} statements'.format(
+        'split_offsets (copy)', time.time() - start, count))
+
+    start = time.time()
+    count = sum(1 for _ in engine.splitstream(io.BytesIO(data), lexer))
+    print('{0:24s} {1:8.2f}s {2:8d} statements'.format(
+        'splitstream (copy)', time.time() - start, count))
+
+
+if __name__ == '__main__':
+    main()
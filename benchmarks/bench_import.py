@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Andi Albrecht, albrecht.andi@gmail.com
+#
+# This benchmark is part of python-sqlparse and is released under
+# the BSD License: http://www.opensource.org/licenses/bsd-license.php
+#
+# Imports sqlparse in fresh interpreters and prints the median time
+# spent importing it (python -X importtime, Python >= 3.7), broken down
+# by submodule, as well as the time until a first split() returns.
+
+import os
+import re
+import subprocess
+import sys
+import timeit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+RUNS = 15
+
+FIRST_SPLIT = '''
+import time
+t = time.perf_counter()
+import sqlparse
+sqlparse.split('select * from foo; select 1;')
+print(time.perf_counter() - t)
+'''
+
+IMPORTTIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def run(*args):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run((sys.executable,) + args, env=env, check=True,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True)
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def import_times():
+    """Collect cumulative import times of sqlparse modules in us."""
+    times = {}
+    for _ in range(RUNS):
+        proc = run('-X', 'importtime', '-c', 'import sqlparse')
+        for line in proc.stderr.splitlines():
+            m = IMPORTTIME.match(line)
+            if m and m.group(4).startswith('sqlparse'):
+                times.setdefault(m.group(4), []).append(int(m.group(2)))
+    return times
+
+
+def main():
+    run('-c', 'import sqlparse')  # Warm up the bytecode cache
+    times = import_times()
+    for name in sorted(times, key=lambda name: -median(times[name])):
+        print('{0:36s} {1:8.1f} ms'.format(
+            name, median(times[name]) / 1000.0))
+
+    first = [float(run('-c', FIRST_SPLIT).stdout) for _ in range(RUNS)]
+    print('{0:36s} {1:8.1f} ms'.format(
+        'import + first split()', median(first) * 1000))
+
+    print('{0:36s} {1:8.1f} ms'.format(
+        'interpreter startup', min(timeit.repeat(
+            lambda: run('-c', 'pass'), number=1, repeat=RUNS)) * 1000))
+
+
+if __name__ == '__main__':
+    main()
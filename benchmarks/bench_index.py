@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Andi Albrecht, albrecht.andi@gmail.com
+#
+# This benchmark is part of python-sqlparse and is released under
+# the BSD License: http://www.opensource.org/licenses/bsd-license.php
+#
+# Builds the statement index of a dump made of the test files and prints
+# how long it takes to get the last statement of the dump with
+# sqlparse.load_statement() compared to splitting the whole dump.
+
+import os
+import tempfile
+import time
+
+import sqlparse
+from sqlparse import index
+
+FILES = os.path.join(os.path.dirname(__file__), '..', 'tests', 'files')
+REPEAT = 100
+
+
+def main():
+    parts = []
+    for name in ('function_psql.sql', 'begintag.sql', 'huge_select.sql'):
+        with open(os.path.join(FILES, name), 'rb') as f:
+            parts.append(f.read())
+    fd, path = tempfile.mkstemp(suffix='.sql')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b'\n'.join(parts) * REPEAT)
+        print('{0:.1f} MB'.format(os.path.getsize(path) / 1e6))
+
+        start = time.time()
+        with open(path, 'rb') as f:
+            expected = list(sqlparse.splitstream(f))[-1][1]
+        print('{0:16s} {1:8.3f}s'.format('splitstream', time.time() - start))
+
+        start = time.time()
+        count = len(index.build(path))
+        print('{0:16s} {1:8.3f}s'.format('build', time.time() - start))
+
+        start = time.time()
+        stmt = sqlparse.load_statement(path, count - 1)
+        print('{0:16s} {1:8.3f}s'.format('load_statement',
+                                         time.time() - start))
+        assert str(stmt) == expected
+    finally:
+        os.remove(path)
+        if os.path.exists(path + index.INDEX_SUFFIX):
+            os.remove(path + index.INDEX_SUFFIX)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Andi Albrecht, albrecht.andi@gmail.com
+#
+# This benchmark is part of python-sqlparse and is released under
+# the BSD License: http://www.opensource.org/licenses/bsd-license.php
+#
+# Times tokenizing INSERT statements with a single, growing literal.
+# Time per megabyte should stay about the same for every size.
+
+import timeit
+
+from sqlparse import lexer
+
+LITERALS = [
+    ('json string', "'", '{"key": [1, 2, "va\\\\lue", null]}', "'"),
+    ('escaped string', "'", "it''s \\' ok ", "'"),
+    ('quoted name', '"', 'column name ', '"'),
+    ('backquoted name', '`', 'column``name ', '`'),
+]
+
+
+def main():
+    for name, start, body, end in LITERALS:
+        print(name)
+        for size in (1, 4, 16):
+            n = size * 1024 * 1024 // len(body)
+            sql = 'INSERT INTO t VALUES ({0}{1}{2});'.format(
+                start, body * n, end)
+            secs = min(timeit.repeat(lambda: list(lexer.tokenize(sql)),
+                                     number=1, repeat=3))
+            print('  {0:3d} MB: {1:8.4f}s  {2:8.4f}s/MB'.format(
+                size, secs, secs / size))
+
+
+if __name__ == '__main__':
+    main()
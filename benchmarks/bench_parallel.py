@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Andi Albrecht, albrecht.andi@gmail.com
+#
+# This benchmark is part of python-sqlparse and is released under
+# the BSD License: http://www.opensource.org/licenses/bsd-license.php
+#
+# Parses a dump made of the test files with sqlparse.parse() and with
+# sqlparse.parallel.parse() using up to as many processes as there are
+# CPUs and prints the times.
+
+import multiprocessing
+import os
+import tempfile
+import time
+
+import sqlparse
+from sqlparse import parallel
+
+FILES = os.path.join(os.path.dirname(__file__), '..', 'tests', 'files')
+REPEAT = 100
+
+
+def get_type(stmt):
+    return stmt.get_type()
+
+
+def main():
+    parts = []
+    for name in ('function_psql.sql', 'begintag.sql', 'huge_select.sql'):
+        with open(os.path.join(FILES, name), 'rb') as f:
+            parts.append(f.read())
+    fd, path = tempfile.mkstemp(suffix='.sql')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b'\n'.join(parts) * REPEAT)
+        print('{0:.1f} MB'.format(os.path.getsize(path) / 1e6))
+
+        start = time.time()
+        with open(path, 'rb') as f:
+            expected = [get_type(stmt) for stmt in sqlparse.parsestream(f)]
+        print('{0:16s} {1:8.2f}s'.format('parsestream', time.time() - start))
+
+        processes = 1
+        while processes <= multiprocessing.cpu_count():
+            start = time.time()
+            types = list(parallel.parse(path, get_type, processes))
+            print('{0:16s} {1:8.2f}s'.format(
+                '{0} processes'.format(processes), time.time() - start))
+            assert types == expected
+            processes *= 2
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
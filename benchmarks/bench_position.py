@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Andi Albrecht, albrecht.andi@gmail.com
+#
+# This benchmark is part of python-sqlparse and is released under
+# the BSD License: http://www.opensource.org/licenses/bsd-license.php
+#
+# Looks up the token at each offset of a large statement with a linear
+# scan over its tokens and with the offsets recorded by the statement
+# splitter, then the position of each token, and prints the times.
+
+import os
+import time
+
+import sqlparse
+from sqlparse import sql
+
+FILES = os.path.join(os.path.dirname(__file__), '..', 'tests', 'files')
+STEP = 7
+
+
+def main():
+    with open(os.path.join(FILES, 'huge_select.sql')) as f:
+        stmt = sqlparse.parse(f.read())[0]
+    offsets = range(0, len(stmt.value), STEP)
+    print('{0} tokens, {1} lookups'.format(len(list(stmt.flatten())),
+                                           len(offsets)))
+
+    for name, lookup in [('linear', sql.Statement.get_token_at_offset),
+                         ('recorded',
+                          sql.Statement.get_token_at_source_offset)]:
+        start = time.time()
+        tokens = [lookup(stmt, offset) for offset in offsets]
+        print('{0:16s} {1:8.2f}s'.format(name, time.time() - start))
+    assert tokens == [stmt.get_token_at_offset(offset)
+                      for offset in offsets]
+
+    start = time.time()
+    for token in stmt.flatten():
+        token.get_position()
+    print('{0:16s} {1:8.2f}s'.format('positions', time.time() - start))
+
+
+if __name__ == '__main__':
+    main()
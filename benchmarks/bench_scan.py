@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Andi Albrecht, albrecht.andi@gmail.com
+#
+# This benchmark is part of python-sqlparse and is released under
+# the BSD License: http://www.opensource.org/licenses/bsd-license.php
+#
+# Counts the DML keywords of a large script in different ways and
+# prints the time and the memory allocated at most while doing so.
+
+import os
+import timeit
+import tracemalloc
+
+from sqlparse import lexer, tokens as T
+
+FILES = os.path.join(os.path.dirname(__file__), '..', 'tests', 'files')
+
+
+def count_tokenize(sql):
+    return sum(1 for ttype, _ in lexer.tokenize(sql) if ttype is T.DML)
+
+
+def count_list(sql):
+    return sum(1 for ttype, _ in list(lexer.tokenize(sql)) if ttype is T.DML)
+
+
+def count_columnar(sql):
+    return lexer.tokenize_columnar(sql).ttypes.count(T.DML.id)
+
+
+def count_scan(sql):
+    counts = [0]
+
+    def on_token(ttype, start, end):
+        if ttype is T.DML:
+            counts[0] += 1
+    lexer.scan(sql, on_token)
+    return counts[0]
+
+
+def main():
+    with open(os.path.join(FILES, 'huge_select.sql')) as f:
+        sql = f.read() * 20
+    print('{0} characters'.format(len(sql)))
+    for func in (count_list, count_tokenize, count_columnar, count_scan):
+        secs = min(timeit.repeat(lambda: func(sql), number=1, repeat=3))
+        tracemalloc.start()
+        count = func(sql)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print('{0:16s} {1:5d} DML  {2:8.4f}s  {3:10.1f} KB peak'.format(
+            func.__name__, count, secs, peak / 1024.0))
+
+
+if __name__ == '__main__':
+    main()
@@ -7,65 +7,203 @@
 
 """Parse SQL statements."""
 
+import importlib
+import sys
+
 # Setup namespace
 from sqlparse import sql
-from sqlparse import cli
+from sqlparse import dialects
 from sqlparse import engine
+from sqlparse import lexer
 from sqlparse import tokens
-from sqlparse import filters
-from sqlparse import formatter
 
-from sqlparse.compat import text_type
+from sqlparse.compat import binary_types, string_types, text_type
 
 __version__ = '0.2.0.dev0'
-__all__ = ['engine', 'filters', 'formatter', 'sql', 'tokens', 'cli']
+__all__ = ['dialects', 'engine', 'filters', 'formatter', 'index', 'parallel',
+           'sql', 'tokens', 'cli']
+
+# Submodules not needed for parsing and splitting. They are imported on
+# first attribute access, e.g. the command line app pulls in argparse.
+_LAZY_SUBMODULES = ('cli', 'filters', 'formatter', 'index', 'parallel')
+
+
+def __getattr__(name):
+    if name in _LAZY_SUBMODULES:
+        return importlib.import_module('sqlparse.' + name)
+    raise AttributeError(
+        "module 'sqlparse' has no attribute '{0}'".format(name))
 
 
-def parse(sql, encoding=None):
+if sys.version_info < (3, 7):
+    # No module level __getattr__ (PEP 562), import them right away.
+    from sqlparse import cli
+    from sqlparse import filters
+    from sqlparse import formatter
+    from sqlparse import index
+    from sqlparse import parallel
+
+
+def parse(sql, encoding=None, lazy_bodies=False, dialect=None, dedup=None):
     """Parse sql and return a list of statements.
 
-    :param sql: A string containing one or more SQL statements.
-    :param encoding: The encoding of the statement (optional).
+    :param sql: A string or bytes-like object containing one or more SQL
+        statements, or a path-like object naming a file to read them from.
+    :param encoding: The encoding of the statement (optional). Binary
+        input without a byte order mark defaults to UTF-8.
+    :param lazy_bodies: If ``True``, dollar-quoted strings like function
+        bodies are kept as :class:`~sqlparse.sql.DollarQuoted` tokens
+        that are parsed when their tokens are first accessed.
+    :param dialect: The SQL dialect, either the name of a registered
+        dialect or a :class:`~sqlparse.dialects.Dialect` instance
+        (optional). See :mod:`sqlparse.dialects`.
+    :param dedup: If ``True``, statements with the same text are parsed
+        only once and are the same :class:`~sqlparse.sql.Statement`
+        instance, which must not be changed then. A
+        :class:`~sqlparse.engine.StatementCache` can be passed instead
+        to get copies, to share it between calls or to see how many
+        statements weren't parsed again.
     :returns: A tuple of :class:`~sqlparse.sql.Statement` instances.
     """
-    return tuple(parsestream(sql, encoding))
+    return tuple(parsestream(sql, encoding, lazy_bodies, dialect, dedup))
 
 
-def parsestream(stream, encoding=None):
+def parsestream(stream, encoding=None, lazy_bodies=False, dialect=None,
+                dedup=None):
     """Parses sql statements from file-like object.
 
-    :param stream: A file-like object.
+    The stream is read in chunks and statements are yielded as soon as
+    they are complete, so the whole input is never held in memory.
+
+    :param stream: A file-like object in text or binary mode, or a
+        path-like object. Files given by path are memory-mapped.
     :param encoding: The encoding of the stream contents (optional).
+    :param lazy_bodies: If ``True``, dollar-quoted strings are parsed
+        only when needed, see :func:`parse`.
+    :param dialect: The SQL dialect (optional), see :func:`parse`.
+    :param dedup: Parse repeated statements only once (optional), see
+        :func:`parse`.
     :returns: A generator of :class:`~sqlparse.sql.Statement` instances.
     """
-    stack = engine.FilterStack()
+    stack = engine.FilterStack(dialect)
     stack.enable_grouping()
+    if lazy_bodies:
+        stack.enable_lazy_bodies()
+    if dedup:
+        stack.enable_dedup(None if dedup is True else dedup)
     return stack.run(stream, encoding)
 
 
-def format(sql, encoding=None, **options):
+def format(sql, encoding=None, dialect=None, **options):
     """Format *sql* according to *options*.
 
     Available options are documented in :ref:`formatting`.
 
     In addition to the formatting options this function accepts the
-    keyword "encoding" which determines the encoding of the statement.
+    keyword "encoding" which determines the encoding of the statement
+    and "dialect" which selects the SQL dialect, see :func:`parse`.
 
     :returns: The formatted SQL statement as string.
     """
-    stack = engine.FilterStack()
+    from sqlparse import filters, formatter
+
+    stack = engine.FilterStack(dialect)
     options = formatter.validate_options(options)
     stack = formatter.build_filter_stack(stack, options)
     stack.postprocess.append(filters.SerializerUnicode())
     return ''.join(stack.run(sql, encoding))
 
 
-def split(sql, encoding=None):
+def split(sql, encoding=None, lazy_bodies=False, dialect=None):
     """Split *sql* into single statements.
 
-    :param sql: A string containing one or more SQL statements.
-    :param encoding: The encoding of the statement (optional).
+    :param sql: A string or bytes-like object containing one or more SQL
+        statements, or a path-like object naming a file to read them from.
+    :param encoding: The encoding of the statement (optional). Binary
+        input without a byte order mark defaults to UTF-8.
+    :param lazy_bodies: If ``True``, dollar-quoted strings like function
+        bodies aren't tokenized. They must be terminated then.
+    :param dialect: The SQL dialect (optional), see :func:`parse`.
     :returns: A list of strings.
     """
-    stack = engine.FilterStack()
+    if isinstance(sql, string_types) or isinstance(sql, binary_types):
+        text = lexer._text(sql, encoding)
+        return [text[start:end].strip() for start, end in
+                engine.split_offsets(text, lexer.Lexer(dialect), lazy_bodies)]
+
+    stack = engine.FilterStack(dialect)
+    if lazy_bodies:
+        stack.enable_lazy_bodies()
     return [text_type(stmt).strip() for stmt in stack.run(sql, encoding)]
+
+
+def split_offsets(sql, encoding=None, lazy_bodies=False, dialect=None):
+    """Find the statements in *sql* without parsing them.
+
+    The statements are the same :func:`split` returns, but only their
+    offsets are, which is a lot cheaper.
+
+    :param sql: A string or bytes-like object containing one or more SQL
+        statements.
+    :param encoding: The encoding of the statement (optional), see
+        :func:`split`.
+    :param lazy_bodies: See :func:`split`.
+    :param dialect: The SQL dialect (optional), see :func:`parse`.
+    :returns: A list of ``(start, end)`` tuples. Each one is a slice of
+        *sql* (after decoding it) with a statement and the whitespace
+        and comments after it on the same line, just like ``str()`` of
+        the statements :func:`parse` returns.
+    """
+    return engine.split_offsets(lexer._text(sql, encoding),
+                                lexer.Lexer(dialect), lazy_bodies)
+
+
+def splitstream(stream, encoding=None, lazy_bodies=False, dialect=None):
+    """Split the statements read from *stream* one by one.
+
+    Each statement is returned as soon as it's complete and only the
+    statement at hand is kept in memory, so dumps of any size can be
+    split.
+
+    :param stream: A file-like object in text or binary mode, or a
+        path-like object naming a file that is read in binary mode.
+    :param encoding: The encoding of the stream contents (optional), see
+        :func:`split`.
+    :param lazy_bodies: See :func:`split`.
+    :param dialect: The SQL dialect (optional), see :func:`parse`.
+    :returns: A generator of ``(offset, statement)`` tuples. *statement*
+        is a string as returned by :func:`split` and *offset* is where
+        it starts in *stream*: the byte offset for binary streams and
+        files, the character offset for text streams. Empty statements
+        are skipped.
+    """
+    if hasattr(stream, '__fspath__'):
+        with open(stream.__fspath__(), 'rb') as f:
+            for item in splitstream(f, encoding, lazy_bodies, dialect):
+                yield item
+        return
+
+    for item in engine.splitstream(stream, lexer.Lexer(dialect), encoding,
+                                   lazy_bodies):
+        yield item
+
+
+def load_statement(path, n, encoding=None, lazy_bodies=False, dialect=None):
+    """Parse a single statement of a file, using its statement index.
+
+    The index is saved next to the file and built when it's missing or
+    the size or modification time of the file changed, see
+    :mod:`sqlparse.index`. With an index at hand only statement *n* is
+    read and parsed.
+
+    :param path: The path of the file.
+    :param n: The number of the statement, counting from 0. Empty
+        statements aren't counted (see :func:`splitstream`).
+    :param encoding: The encoding of the file (optional), see
+        :func:`split`.
+    :param lazy_bodies: See :func:`parse`.
+    :param dialect: The SQL dialect (optional), see :func:`parse`.
+    :returns: A :class:`~sqlparse.sql.Statement` instance.
+    """
+    from sqlparse import index
+    return index.load_statement(path, n, encoding, lazy_bodies, dialect)
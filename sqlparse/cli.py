@@ -23,7 +23,7 @@ import argparse
 import sys
 
 import sqlparse
-from sqlparse.compat import PY2
+from sqlparse.compat import PY2, text_type
 from sqlparse.exceptions import SQLParseError
 
 
@@ -118,6 +118,24 @@ def create_parser():
         type=int,
         help='Column after which lists should be wrapped')
 
+    group = parser.add_argument_group('Index Options')
+
+    group.add_argument(
+        '--index',
+        dest='index',
+        action='store_true',
+        default=False,
+        help='print the statement index of FILE instead of formatting it, '
+             'the index is saved as FILE.sqlidx')
+
+    group.add_argument(
+        '--statement',
+        metavar='N',
+        dest='statement',
+        type=int,
+        help='only format statement N of FILE (counting from 0), using '
+             'the statement index of FILE')
+
     return parser
 
 
@@ -131,8 +149,23 @@ def main(args=None):
     parser = create_parser()
     args = parser.parse_args(args)
 
+    indexed = args.index or args.statement is not None
     if args.filename == '-':  # read from stdin
+        if indexed:
+            return _error('Statement indexes need a FILE, not stdin')
         data = sys.stdin.read()
+    elif indexed:
+        try:
+            if args.index:
+                index = sqlparse.index.load(args.filename)
+            else:
+                data = text_type(sqlparse.load_statement(
+                    args.filename, args.statement))
+        except (IOError, OSError) as e:
+            return _error('Failed to read {0}: {1}'.format(args.filename, e))
+        except IndexError:
+            return _error('{0} has no statement {1}'.format(
+                args.filename, args.statement))
     else:
         try:
             # TODO: Needs to deal with encoding
@@ -148,6 +181,14 @@ def main(args=None):
     else:
         stream = sys.stdout
 
+    if args.index:
+        for n, entry in enumerate(index):
+            stream.write('{0}\t{1}\t{2}\t{3}\t{4}\t{5}\n'.format(
+                n, entry.line, entry.offset, entry.length, entry.type,
+                entry.hash))
+        stream.flush()
+        return 0
+
     formatter_opts = vars(args)
     try:
         formatter_opts = sqlparse.formatter.validate_options(formatter_opts)
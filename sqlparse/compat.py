@@ -22,6 +22,8 @@ PY3 = sys.version_info[0] == 3
 
 if PY3:
     def u(s, encoding=None):
+        if isinstance(s, binary_types):
+            return str(s, encoding or 'utf-8')
         return str(s)
 
 
@@ -31,6 +33,7 @@ if PY3:
 
     text_type = str
     string_types = (str,)
+    binary_types = (bytes, bytearray, memoryview)
     from io import StringIO
 
 
@@ -51,4 +54,5 @@ elif PY2:
 
     text_type = unicode
     string_types = (str, unicode,)
+    binary_types = (bytearray, memoryview)
     from StringIO import StringIO
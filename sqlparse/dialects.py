@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Andi Albrecht, albrecht.andi@gmail.com
+#
+# This module is part of python-sqlparse and is released under
+# the BSD License: http://www.opensource.org/licenses/bsd-license.php
+
+"""SQL dialect profiles.
+
+A dialect is the set of lexer rules and keywords used to tokenize SQL.
+The lexer compiles the rules of a dialect when it's first used and keeps
+them for later calls, so a dialect only pays for its own rules.
+"""
+
+from sqlparse.exceptions import SQLParseError
+from sqlparse.keywords import (
+    SQL_REGEX, KEYWORDS, KEYWORDS_COMMON, KEYWORDS_DRUID, KEYWORDS_ORACLE,
+    _KEYWORDS_MERGED, is_keyword, keyword_lookup)
+
+
+class Dialect(object):
+    """Lexer rules and keywords of an SQL dialect.
+
+    *rules* is a list of ``(regex, action)`` pairs like
+    :data:`sqlparse.keywords.SQL_REGEX`. If a list of keyword tables is
+    given as *keywords*, words matched by rules with the action
+    :func:`sqlparse.keywords.is_keyword` are looked up in these tables
+    instead. Later tables win over earlier ones.
+
+    ``keywords`` is the merged keyword table of the dialect and
+    ``is_keyword`` the function its rules look words up with.
+    """
+
+    def __init__(self, name, rules=SQL_REGEX, keywords=None):
+        self.name = name
+        if keywords is None:
+            self.rules = list(rules)
+            self.keywords = _KEYWORDS_MERGED
+            self.is_keyword = is_keyword
+            return
+
+        self.keywords = {}
+        for words in keywords:
+            self.keywords.update(words)
+        self.is_keyword = keyword_lookup(self.keywords)
+        self.rules = [(regex, self.is_keyword if action is is_keyword
+                       else action) for regex, action in rules]
+
+    def __reduce__(self):
+        # Pickled by name, so the dialect must be registered. Its rules
+        # refer to keyword lookup functions that can't be pickled.
+        return get, (self.name,)
+
+    def __repr__(self):
+        return '<{0} {1!r}>'.format(self.__class__.__name__, self.name)
+
+
+_DIALECTS = {}
+
+
+def register(dialect):
+    """Register *dialect* under its name, replacing any previous one."""
+    _DIALECTS[dialect.name] = dialect
+
+
+def get(dialect):
+    """Return the dialect registered as *dialect*.
+
+    :class:`Dialect` instances are returned as they are.
+    """
+    if isinstance(dialect, Dialect):
+        return dialect
+    try:
+        return _DIALECTS[dialect]
+    except KeyError:
+        raise SQLParseError('Unknown dialect: {0!r}'.format(dialect))
+
+
+def names():
+    """Return the names of all registered dialects."""
+    return sorted(_DIALECTS)
+
+
+def _without(*regexes):
+    """Return the rules of SQL_REGEX except those for *regexes*."""
+    return [rule for rule in SQL_REGEX if rule[0] not in regexes]
+
+
+# Rules of only some dialects
+_BACKTICK_NAME = r"`(``|[^`])*`"
+_ACUTE_NAME = r"´(´´|[^´])*´"
+_BRACKET_NAME = r'(?<![\w\])])(\[[^\]]+\])'
+_DOLLAR_TAG = r'\$([_A-Z]\w*)?\$'
+_VARIABLE_NAME = r'(@|##|#)[A-Z]\w+'
+
+#: Everything sqlparse knows, this is the default dialect.
+GENERIC = Dialect('generic')
+POSTGRESQL = Dialect('postgresql', _without(
+    _BACKTICK_NAME, _ACUTE_NAME, _BRACKET_NAME, _VARIABLE_NAME),
+    [KEYWORDS, KEYWORDS_COMMON])
+MYSQL = Dialect('mysql', _without(
+    _ACUTE_NAME, _BRACKET_NAME, _DOLLAR_TAG),
+    [KEYWORDS, KEYWORDS_COMMON])
+ORACLE = Dialect('oracle', _without(
+    _BACKTICK_NAME, _ACUTE_NAME, _BRACKET_NAME, _DOLLAR_TAG),
+    [KEYWORDS, KEYWORDS_ORACLE, KEYWORDS_COMMON])
+DRUID = Dialect('druid', _without(
+    _BACKTICK_NAME, _ACUTE_NAME, _BRACKET_NAME, _DOLLAR_TAG, _VARIABLE_NAME),
+    [KEYWORDS, KEYWORDS_DRUID, KEYWORDS_COMMON])
+
+for _dialect in (GENERIC, POSTGRESQL, MYSQL, ORACLE, DRUID):
+    register(_dialect)
@@ -7,10 +7,16 @@
 
 from sqlparse.engine import grouping
 from sqlparse.engine.filter_stack import FilterStack
+from sqlparse.engine.statement_cache import StatementCache
 from sqlparse.engine.statement_splitter import StatementSplitter
+from sqlparse.engine.statement_splitter import split_offsets
+from sqlparse.engine.statement_splitter import splitstream
 
 __all__ = [
     'grouping',
     'FilterStack',
+    'StatementCache',
     'StatementSplitter',
+    'split_offsets',
+    'splitstream',
 ]
@@ -7,32 +7,51 @@
 
 """filter"""
 
-from sqlparse import lexer
 from sqlparse.engine import grouping
+from sqlparse.engine.statement_cache import StatementCache
 from sqlparse.engine.statement_splitter import StatementSplitter
+from sqlparse.lexer import Lexer
 
 
 class FilterStack(object):
-    def __init__(self):
+    def __init__(self, dialect=None, lexer=None):
+        self.lexer = Lexer(dialect) if lexer is None else lexer
         self.preprocess = []
         self.stmtprocess = []
         self.postprocess = []
         self._grouping = False
+        self._lazy_bodies = False
+        self._cache = None
 
     def enable_grouping(self):
         self._grouping = True
 
+    def enable_lazy_bodies(self):
+        self._lazy_bodies = True
+
+    def enable_dedup(self, cache=None):
+        """Group each distinct statement only once.
+
+        *cache* is the :class:`StatementCache` to use, a new one if not
+        given.
+        """
+        self._cache = StatementCache() if cache is None else cache
+
     def run(self, sql, encoding=None):
-        stream = lexer.tokenize(sql, encoding)
+        stream = self.lexer.get_tokens(sql, encoding, self._lazy_bodies)
         # Process token stream
         for filter_ in self.preprocess:
             stream = filter_.process(stream)
 
-        stream = StatementSplitter().process(stream)
+        stream = StatementSplitter(self.lexer).process(stream)
 
         # Output: Stream processed Statements
         for stmt in stream:
-            if self._grouping:
+            if self._grouping and self._cache is not None:
+                # Filters change the statements, they can't be shared.
+                copy = bool(self.stmtprocess or self.postprocess)
+                stmt = self._cache.get(stmt, grouping.group, copy)
+            elif self._grouping:
                 stmt = grouping.group(stmt)
 
             for filter_ in self.stmtprocess:
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Andi Albrecht, albrecht.andi@gmail.com
+#
+# This module is part of python-sqlparse and is released under
+# the BSD License: http://www.opensource.org/licenses/bsd-license.php
+
+from collections import OrderedDict
+
+from sqlparse import sql
+from sqlparse.keywords import CacheInfo
+
+
+def _copy(token, parent=None):
+    """Return a copy of *token* and its children, nothing is parsed."""
+    cls = type(token)
+    new = cls.__new__(cls)
+    new.value = token.value
+    new.ttype = token.ttype
+    new.normalized = token.normalized
+    new.is_keyword = token.is_keyword
+    new.parent = parent
+    if cls is sql.DollarQuoted:
+        new._load = token._load
+        new._tokens = None if token._tokens is None else [
+            _copy(child, new) for child in token._tokens]
+    elif isinstance(token, sql.TokenList):
+        new.tokens = [_copy(child, new) for child in token.tokens]
+    return new
+
+
+class StatementCache(object):
+    """Parsed statements by their text, so that repeated statements are
+    grouped only once.
+
+    Statements seen before are the very same :class:`~sqlparse.sql.Statement`
+    instance each time, so they must not be changed and their position
+    is the one of their first occurrence. With ``copy=True`` they are
+    copies of the statement parsed first instead, with positions of
+    their own, which is still a lot cheaper than parsing them again.
+
+    *maxsize* limits the number of statements kept, 1000 by default, so
+    that the memory used stays bounded when parsing a stream. Once the
+    cache is full, the least recently used statement is evicted to add
+    another one. With ``None`` there's no limit.
+
+    A cache can be used for several inputs, but only with the same
+    dialect and options.
+    """
+
+    def __init__(self, maxsize=1000, copy=False):
+        self.maxsize = maxsize
+        self.copy = copy
+        self.hits = 0
+        self.misses = 0
+        self._statements = OrderedDict()  # the most recently used last
+
+    def get(self, stmt, group, copy=False):
+        """Return the parsed statement for the ungrouped *stmt*.
+
+        *group* is called to parse statements not in the cache. The
+        result is copied if *copy* or the ``copy`` attribute is true.
+        """
+        copy = copy or self.copy
+        cached = self._statements.pop(stmt.value, None)
+        if cached is not None:
+            self._statements[stmt.value] = cached
+            self.hits += 1
+            if not copy:
+                return cached
+            new = _copy(cached)
+            new.offset, new.line, new.column = (
+                stmt.offset, stmt.line, stmt.column)
+            return new
+
+        self.misses += 1
+        stmt = group(stmt)
+        if self.maxsize != 0:
+            # The cached statement must not be the one that is changed.
+            self._statements[stmt.value] = _copy(stmt) if copy else stmt
+            if self.maxsize is not None \
+                    and len(self._statements) > self.maxsize:
+                self._statements.popitem(last=False)
+        return stmt
+
+    def cache_info(self):
+        """Return a :class:`~sqlparse.keywords.CacheInfo` tuple, *hits*
+        are the statements that weren't parsed again."""
+        return CacheInfo(self.hits, self.misses, self.maxsize,
+                         len(self._statements))
+
+    def clear(self):
+        """Empty the cache and reset its statistics."""
+        self._statements.clear()
+        self.hits = self.misses = 0
@@ -5,13 +5,53 @@
 # This module is part of python-sqlparse and is released under
 # the BSD License: http://www.opensource.org/licenses/bsd-license.php
 
+import codecs
+from functools import partial
+
 from sqlparse import sql, tokens as T
+from sqlparse.compat import text_type
+from sqlparse.engine import grouping
+from sqlparse.lexer import Lexer, _get_decoder, _lex_stream
+
+
+def _load_body(lexer, value):
+    """Tokenize and group the contents of a dollar-quoted string."""
+    body = sql.TokenList([sql.Token(ttype, value)
+                          for ttype, value in lexer.get_tokens(value)])
+    return grouping.group(body).tokens
+
+
+# Tokens that still belong to a statement after its closing semicolon.
+# Other tokens are the data following a COPY statement in dump mode.
+_EOS_TTYPE = T.Whitespace, T.Comment.Single, T.Other
+
+
+def _position_after(position, text):
+    """Return the :class:`~sqlparse.sql.Position` where *text* starting
+    at *position* ends."""
+    offset, line, column = position
+    newlines = text.count(u'\n')
+    if newlines:
+        return sql.Position(offset + len(text), line + newlines,
+                            len(text) - text.rfind(u'\n'))
+    return sql.Position(offset + len(text), line, column + len(text))
 
 
 class StatementSplitter(object):
     """Filter that split stream at individual statements"""
 
-    def __init__(self):
+    def __init__(self, lexer=None, position=None):
+        # Dollar-quoted strings are tokenized with the same lexer
+        self._load_body = partial(_load_body, lexer or Lexer())
+        # Changed by DELIMITER commands, see the dump modes of Lexer.
+        # Other Keyword.Command tokens, e.g. from the keywords of the
+        # lexer, are keywords like any other.
+        self._delimiter = ';'
+        self._delimiter_commands = 'delimiter' in getattr(
+            lexer, 'dump_modes', ())
+        # Where the next statement starts in the input, position is where
+        # the input starts if it's only the end of the source.
+        self._offset, self._line, self._column = position or (0, 1, 1)
         self._reset()
 
     def _reset(self):
@@ -27,6 +67,12 @@ class StatementSplitter(object):
 
     def _change_splitlevel(self, ttype, value):
         """Get the new split level (increase, decrease or remain equal)"""
+        # MySQL client: "DELIMITER //" is a statement of its own
+        if ttype is T.Command and self._delimiter_commands:
+            self._delimiter = value.split()[1]
+            self.consume_ws = True
+            return 0
+
         # PostgreSQL
         if ttype == T.Name.Builtin and value[0] == '$' and value[-1] == '$':
 
@@ -92,18 +138,54 @@ class StatementSplitter(object):
         # Default
         return 0
 
+    def _ends_statement(self, value):
+        """Return ``True`` if the punctuation *value* ends the statement.
+
+        Other delimiters than the semicolon end statements at any level.
+        """
+        if value != self._delimiter:
+            return False
+        return self.level <= 0 or self._delimiter != ';'
+
+    def _feed(self, ttype, text, start, end):
+        """Update the split level for the token ``text[start:end]``.
+
+        Returns ``True`` if the token starts a new statement. Unlike
+        :meth:`process`, no tokens are kept and the token's value is only
+        sliced if its type matters for splitting.
+        """
+        new = self.consume_ws and ttype not in _EOS_TTYPE
+        if new:
+            self._reset()
+
+        # Other tokens never change the split level.
+        if ttype in T.Keyword or ttype is T.Name.Builtin:
+            self.level += self._change_splitlevel(ttype, text[start:end])
+        elif ttype is T.Punctuation and self._ends_statement(
+                text[start:end]):
+            self.consume_ws = True
+        return new
+
+    def _statement(self):
+        """Return the statement of the tokens and record its position."""
+        stmt = sql.Statement(self.tokens)
+        stmt.offset, stmt.line, stmt.column = (
+            self._offset, self._line, self._column)
+        stmt._record_source(self.tokens)
+        self._offset, self._line, self._column = _position_after(
+            (self._offset, self._line, self._column), stmt.value)
+        return stmt
+
     def process(self, stream):
         """Process the stream"""
-        EOS_TTYPE = T.Whitespace, T.Comment.Single
-
         # Run over all stream tokens
         for ttype, value in stream:
             # Yield token if we finished a statement and there's no whitespaces
             # It will count newline token as a non whitespace. In this context
             # whitespace ignores newlines.
             # why don't multi line comments also count?
-            if self.consume_ws and ttype not in EOS_TTYPE:
-                yield sql.Statement(self.tokens)
+            if self.consume_ws and ttype not in _EOS_TTYPE:
+                yield self._statement()
 
                 # Reset filter and prepare to process next statement
                 self._reset()
@@ -112,12 +194,106 @@ class StatementSplitter(object):
             self.level += self._change_splitlevel(ttype, value)
 
             # Append the token to the current statement
-            self.tokens.append(sql.Token(ttype, value))
+            if ttype is T.String.Dollar:
+                self.tokens.append(sql.DollarQuoted(value, self._load_body))
+            else:
+                self.tokens.append(sql.Token(ttype, value))
 
             # Check if we get the end of a statement
-            if self.level <= 0 and ttype is T.Punctuation and value == ';':
+            if ttype is T.Punctuation and self._ends_statement(value):
                 self.consume_ws = True
 
         # Yield pending statement (if any)
         if self.tokens:
-            yield sql.Statement(self.tokens)
+            yield self._statement()
+
+
+def split_offsets(text, lexer=None, lazy_bodies=False):
+    """Return the ``(start, end)`` offsets of the statements in *text*.
+
+    The statements are the same :class:`StatementSplitter` finds, but
+    *text* is only scanned by *lexer*: no token is created and only the
+    values of keywords and a few other tokens are looked at.
+    """
+    lexer = lexer or Lexer()
+    splitter = StatementSplitter(lexer)
+    offsets = []
+    first = [0]  # start of the current statement
+
+    def on_token(ttype, start, end):
+        if splitter._feed(ttype, text, start, end):
+            offsets.append((first[0], start))
+            first[0] = start
+
+    lexer.scan(text, on_token, lazy_bodies=lazy_bodies)
+    if first[0] < len(text):
+        offsets.append((first[0], len(text)))
+    return offsets
+
+
+def splitstream(stream, lexer=None, encoding=None, lazy_bodies=False):
+    """Generate ``(offset, statement)`` for the statements in *stream*.
+
+    *stream* is read in chunks and each statement is yielded as soon as
+    it's complete, without surrounding whitespace. Empty statements are
+    skipped. Only the statement at hand is kept in memory. *offset* is
+    where the statement starts: in bytes for binary streams (counting a
+    byte order mark, if the encoding has one) and in characters for
+    text streams.
+    """
+    for start, _, _, stmt in _splitstream(stream, lexer, encoding,
+                                          lazy_bodies):
+        yield start, stmt
+
+
+def _splitstream(stream, lexer=None, encoding=None, lazy_bodies=False):
+    """Generate ``(start, end, position, statement)``, see
+    :func:`splitstream`.
+
+    *end* is where the statement ends without trailing whitespace and
+    *position* the :class:`~sqlparse.sql.Position` of its first character.
+    """
+    lexer = lexer or Lexer()
+    decoder = _get_decoder(encoding)
+    tokens = _lex_stream(stream, encoding, lexer._get_dispatch(lazy_bodies),
+                         decoder, lexer._get_dump())
+    if isinstance(stream.read(0), text_type):
+        size = len
+    else:
+        # Text is encoded again to count its bytes. The encoder is
+        # created once the decoder knows the encoding.
+        encoders = []
+
+        def size(text):
+            if not encoders:
+                encoders.append(codecs.getincrementalencoder(
+                    encoding or decoder.encoding)())
+            return len(encoders[0].encode(text))
+
+    splitter = StatementSplitter(lexer)
+    values = []
+
+    def statement(offset, position):
+        # Returns the statement and where the next one starts
+        raw = u''.join(values)
+        del values[:]
+        stmt = raw.lstrip()
+        body = stmt.rstrip()
+        lead = raw[:len(raw) - len(stmt)]
+        start = offset + size(lead)
+        end = start + size(body)
+        return ((start, end, _position_after(position, lead), body),
+                end + size(stmt[len(body):]),
+                _position_after(position, raw))
+
+    offset, position = 0, sql.Position(0, 1, 1)
+    for ttype, value in tokens:
+        if splitter._feed(ttype, value, 0, len(value)):
+            item, offset, position = statement(offset, position)
+            if item[3]:
+                yield item
+        values.append(value)
+    if values:
+        item, offset, position = statement(offset, position)
+        if item[3]:
+            yield item
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Andi Albrecht, albrecht.andi@gmail.com
+#
+# This module is part of python-sqlparse and is released under
+# the BSD License: http://www.opensource.org/licenses/bsd-license.php
+
+"""Statement indexes for random access into large scripts.
+
+An index lists where each statement of a script starts and how many
+bytes it takes, its position in the text, its type and a hash of its
+text.
+It's saved next to the script in a file named like it with
+:data:`INDEX_SUFFIX` appended and built again as soon as the size or the
+modification time of the script changes.
+"""
+
+import binascii
+import collections
+import hashlib
+import os
+import struct
+
+import sqlparse
+from sqlparse import dialects, tokens as T
+from sqlparse.engine.statement_splitter import _splitstream
+from sqlparse.lexer import Lexer, _file_encoding
+
+INDEX_SUFFIX = '.sqlidx'
+
+_MAGIC = b'SQLIDX\x00\x02'
+# Magic, size and modification time (ns) of the script, statement count
+_HEADER = struct.Struct('<8sQqI')
+# Offset, length, offset in the text, line, column, type (index into the
+# type names), hash
+_RECORD = struct.Struct('<QIQIIH8s')
+_LENGTH = struct.Struct('<H')
+
+Entry = collections.namedtuple(
+    'Entry', 'offset length text_offset line column type hash')
+
+
+class StatementIndex(object):
+    """The index of a script.
+
+    Its items are :class:`Entry` tuples: the byte *offset* and *length*
+    of a statement without surrounding whitespace, the *text_offset* of
+    its first character, the *line* and *column* it starts on (counting
+    from 1), its *type* as returned by
+    :meth:`~sqlparse.sql.Statement.get_type` and the first 16 hex digits
+    of the SHA-1 *hash* of its text.
+    """
+
+    def __init__(self, path, encoding, dialect, types, records):
+        self.path = path
+        self.encoding = encoding
+        self.dialect = dialect
+        self._types = types
+        self._records = records
+
+    def __len__(self):
+        return len(self._records) // _RECORD.size
+
+    def __getitem__(self, n):
+        if n < 0:
+            n += len(self)
+        if not 0 <= n < len(self):
+            raise IndexError('statement index out of range')
+        return _entry(_RECORD.unpack_from(self._records, n * _RECORD.size),
+                      self._types)
+
+    def __iter__(self):
+        for n in range(len(self)):
+            yield self[n]
+
+    def statement(self, n, lazy_bodies=False):
+        """Read and parse statement *n* of the script."""
+        return _read_statement(self.path, self[n], self.encoding,
+                               self.dialect, lazy_bodies)
+
+
+def _entry(record, types):
+    offset, length, text_offset, line, column, type_, digest = record
+    return Entry(offset, length, text_offset, line, column, types[type_],
+                 binascii.hexlify(digest).decode('ascii'))
+
+
+def _fspath(path):
+    return path.__fspath__() if hasattr(path, '__fspath__') else path
+
+
+def _stat(path):
+    """Return the size and modification time (ns) of the file."""
+    st = os.stat(path)
+    mtime = getattr(st, 'st_mtime_ns', None)
+    if mtime is None:  # Python 2
+        mtime = int(st.st_mtime * 1e9)
+    return st.st_size, mtime
+
+
+def _get_type(lexer, stmt, dialect):
+    """Return the type of *stmt*, only lexing what's needed."""
+    for ttype, value in lexer.get_tokens(stmt):
+        if ttype in T.Whitespace or ttype in T.Comment:
+            continue
+        elif ttype in (T.Keyword.DML, T.Keyword.DDL):
+            return value.upper()
+        elif ttype == T.Keyword.CTE:
+            # Finding the statement after the CTE definitions needs
+            # grouping.
+            return sqlparse.parse(stmt, dialect=dialect)[0].get_type()
+        break
+    return 'UNKNOWN'
+
+
+def _pack_strings(strings):
+    data = [_LENGTH.pack(len(strings))]
+    for s in strings:
+        s = s.encode('utf-8')
+        data.append(_LENGTH.pack(len(s)) + s)
+    return b''.join(data)
+
+
+def _unpack_strings(f):
+    def read(size):
+        data = f.read(size)
+        if len(data) != size:
+            raise ValueError('truncated')
+        return data
+
+    count, = _LENGTH.unpack(read(_LENGTH.size))
+    return [read(_LENGTH.unpack(read(_LENGTH.size))[0]).decode('utf-8')
+            for _ in range(count)]
+
+
+def _read_header(f, stat, encoding, dialect):
+    """Read the header of an index.
+
+    Returns the statement count and the type names, or ``None`` if the
+    index doesn't belong to the script as it is now.
+    """
+    try:
+        magic, size, mtime, count = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC or (size, mtime) != stat:
+            return None
+        strings = _unpack_strings(f)
+    except (ValueError, struct.error):
+        return None
+    if strings[:2] != [encoding, dialect.name]:
+        return None
+    records = f.tell()
+    f.seek(0, os.SEEK_END)
+    if f.tell() != records + count * _RECORD.size:
+        return None  # not completely written
+    return count, strings[2:]
+
+
+def build(path, encoding=None, dialect=None):
+    """Build the index of the script at *path* and save it.
+
+    The index is still returned if it can't be saved.
+
+    :param path: The path of the script.
+    :param encoding: The encoding of the script (optional). Without it,
+        the byte order mark decides, UTF-8 is the default.
+    :param dialect: The SQL dialect (optional), see :func:`sqlparse.parse`.
+    :returns: A :class:`StatementIndex`.
+    """
+    path = _fspath(path)
+    dialect = dialects.get(dialect or 'generic')
+    encoding, start = _file_encoding(path, encoding)
+    stat = _stat(path)
+    lexer = Lexer(dialect)
+    types, records = {}, []
+    with open(path, 'rb') as f:
+        f.seek(start)
+        for offset, end, position, stmt in _splitstream(f, lexer,
+                                                        encoding):
+            type_ = types.setdefault(_get_type(lexer, stmt, dialect),
+                                     len(types))
+            digest = hashlib.sha1(stmt.encode('utf-8')).digest()[:8]
+            records.append(_RECORD.pack(start + offset, end - offset,
+                                        position.offset, position.line,
+                                        position.column, type_, digest))
+    types = sorted(types, key=types.get)
+    records = b''.join(records)
+
+    try:
+        with open(path + INDEX_SUFFIX, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, stat[0], stat[1],
+                                 len(records) // _RECORD.size))
+            f.write(_pack_strings([encoding, dialect.name] + types))
+            f.write(records)
+    except (IOError, OSError):
+        pass
+    return StatementIndex(path, encoding, dialect, types, records)
+
+
+def load(path, encoding=None, dialect=None):
+    """Return the index of the script at *path*.
+
+    The saved index is used if it's up to date, otherwise it's built
+    again. The parameters are the same as for :func:`build`.
+    """
+    path = _fspath(path)
+    dialect = dialects.get(dialect or 'generic')
+    charset = _file_encoding(path, encoding)[0]
+    try:
+        with open(path + INDEX_SUFFIX, 'rb') as f:
+            header = _read_header(f, _stat(path), charset, dialect)
+            if header is not None:
+                count, types = header
+                f.seek(-count * _RECORD.size, os.SEEK_END)
+                return StatementIndex(path, charset, dialect, types,
+                                      f.read())
+    except (IOError, OSError):
+        pass
+    return build(path, encoding, dialect)
+
+
+def _read_statement(path, entry, encoding, dialect, lazy_bodies):
+    with open(path, 'rb') as f:
+        f.seek(entry.offset)
+        text = f.read(entry.length).decode(encoding)
+    stmt = sqlparse.parse(text, lazy_bodies=lazy_bodies, dialect=dialect)[0]
+    # Positions are in the script, not in the text read.
+    stmt.offset, stmt.line, stmt.column = (
+        entry.text_offset, entry.line, entry.column)
+    return stmt
+
+
+def load_statement(path, n, encoding=None, lazy_bodies=False, dialect=None):
+    """Parse statement *n* (counting from 0) of the script at *path*.
+
+    Only the header of the index and the entry of the statement are
+    read, then the statement is read straight from its offset. The
+    index is built first if it's missing or out of date.
+
+    :raises IndexError: If the script has no statement *n*.
+    """
+    path = _fspath(path)
+    dialect = dialects.get(dialect or 'generic')
+    charset = _file_encoding(path, encoding)[0]
+    entry = None
+    try:
+        with open(path + INDEX_SUFFIX, 'rb') as f:
+            header = _read_header(f, _stat(path), charset, dialect)
+            if header is not None:
+                count, types = header
+                if n < 0:
+                    n += count
+                if not 0 <= n < count:
+                    raise IndexError('statement index out of range')
+                f.seek((n - count) * _RECORD.size, os.SEEK_END)
+                entry = _entry(_RECORD.unpack(f.read(_RECORD.size)), types)
+    except (IOError, OSError):
+        pass
+    if entry is None:
+        entry = build(path, encoding, dialect)[n]
+    return _read_statement(path, entry, charset, dialect, lazy_bodies)
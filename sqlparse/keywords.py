@@ -6,85 +6,160 @@
 # the BSD License: http://www.opensource.org/licenses/bsd-license.php
 
 import re
+import weakref
+from collections import namedtuple
 
 from sqlparse import tokens
 
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
 
-def is_keyword(value):
-    val = value.upper()
-    return (KEYWORDS_COMMON.get(val) or
-            KEYWORDS_ORACLE.get(val) or
-            KEYWORDS.get(val, tokens.Name)), value
 
+class _Cache(dict):
+    """A dict that can be weakly referenced."""
+    __slots__ = ('__weakref__',)
 
-SQL_REGEX = {
-    'root': [
-        (r'(--|# )\+.*?(\r\n|\r|\n|$)', tokens.Comment.Single.Hint),
-        (r'/\*\+[\s\S]*?\*/', tokens.Comment.Multiline.Hint),
 
-        (r'(--|# ).*?(\r\n|\r|\n|$)', tokens.Comment.Single),
-        (r'/\*[\s\S]*?\*/', tokens.Comment.Multiline),
+# Results of the keyword lookups by raw word. When a cache is full it is
+# emptied instead of evicting single entries. All caches share their size
+# and statistics. A cache goes away with its lookup function.
+_cache = _Cache()
+_caches = weakref.WeakValueDictionary({id(_cache): _cache})
+_cache_stats = {'hits': 0, 'misses': 0, 'maxsize': 10000}
 
-        (r'(\r\n|\r|\n)', tokens.Newline),
-        (r'\s+', tokens.Whitespace),
+# Filled in with the keyword tables at the end of this module.
+_KEYWORDS_MERGED = {}
 
-        (r':=', tokens.Assignment),
-        (r'::', tokens.Punctuation),
 
-        (r'\*', tokens.Wildcard),
+def keyword_lookup(table, cache=None):
+    """Return a function like :func:`is_keyword` for the words in *table*.
 
-        (r"`(``|[^`])*`", tokens.Name),
-        (r"´(´´|[^´])*´", tokens.Name),
-        (r'\$([_A-Z]\w*)?\$', tokens.Name.Builtin),
+    *table* maps upper case words to their token types.
+    """
+    if cache is None:
+        cache = _Cache()
+        _caches[id(cache)] = cache
 
-        (r'\?', tokens.Name.Placeholder),
-        (r'%(\(\w+\))?s', tokens.Name.Placeholder),
-        (r'[$:?]\w+', tokens.Name.Placeholder),
+    def is_keyword(value):
+        result = cache.get(value)
+        if result is not None:
+            _cache_stats['hits'] += 1
+            return result
 
-        # FIXME(andi): VALUES shouldn't be listed here
-        # see https://github.com/andialbrecht/sqlparse/pull/64
-        # IN is special, it may be followed by a parenthesis, but
-        # is never a functino, see issue183
-        (r'(CASE|IN|VALUES|USING)\b', tokens.Keyword),
+        _cache_stats['misses'] += 1
+        result = table.get(value.upper(), tokens.Name), value
+        if len(cache) >= _cache_stats['maxsize']:
+            cache.clear()
+        if _cache_stats['maxsize'] > 0:
+            cache[value] = result
+        return result
+    return is_keyword
 
-        (r'(@|##|#)[A-Z]\w+', tokens.Name),
 
-        # see issue #39
-        # Spaces around period `schema . name` are valid identifier
-        # TODO: Spaces before period not implemented
-        (r'[A-Z]\w*(?=\s*\.)', tokens.Name),  # 'Name'   .
-        (r'(?<=\.)[A-Z]\w*', tokens.Name),  # .'Name'
-        (r'[A-Z]\w*(?=\()', tokens.Name),  # side effect: change kw to func
+is_keyword = keyword_lookup(_KEYWORDS_MERGED, _cache)
 
-        # TODO: `1.` and `.1` are valid numbers
-        (r'-?0x[\dA-F]+', tokens.Number.Hexadecimal),
-        (r'-?\d*(\.\d+)?E-?\d+', tokens.Number.Float),
-        (r'-?\d*\.\d+', tokens.Number.Float),
-        (r'-?\d+', tokens.Number.Integer),
 
-        (r"'(''|\\\\|\\'|[^'])*'", tokens.String.Single),
-        # not a real string literal in ANSI SQL:
-        (r'(""|".*?[^\\]")', tokens.String.Symbol),
-        # sqlite names can be escaped with [square brackets]. left bracket
-        # cannot be preceded by word character or a right bracket --
-        # otherwise it's probably an array index
-        (r'(?<![\w\])])(\[[^\]]+\])', tokens.Name),
-        (r'((LEFT\s+|RIGHT\s+|FULL\s+)?(INNER\s+|OUTER\s+|STRAIGHT\s+)?'
-         r'|(CROSS\s+|NATURAL\s+)?)?JOIN\b', tokens.Keyword),
-        (r'END(\s+IF|\s+LOOP|\s+WHILE)?\b', tokens.Keyword),
-        (r'NOT\s+NULL\b', tokens.Keyword),
-        (r'CREATE(\s+OR\s+REPLACE)?\b', tokens.Keyword.DDL),
-        (r'DOUBLE\s+PRECISION\b', tokens.Name.Builtin),
+class KeywordOverlay(object):
+    """A keyword table made of *words* on top of the table *base*.
 
-        (r'[_A-Z]\w*', is_keyword),
+    Words in *words* win, *base* isn't copied.
+    """
 
-        (r'[;:()\[\],\.]', tokens.Punctuation),
-        (r'[<>=~!]+', tokens.Operator.Comparison),
-        (r'[+/@#%^&|`?^-]+', tokens.Operator),
-    ]}
+    __slots__ = ('words', 'base')
+
+    def __init__(self, words, base):
+        self.words = words
+        self.base = base
+
+    def get(self, word, default=None):
+        ttype = self.words.get(word)
+        return self.base.get(word, default) if ttype is None else ttype
+
+
+def cache_info():
+    """Return a :class:`CacheInfo` tuple describing the keyword cache."""
+    return CacheInfo(_cache_stats['hits'], _cache_stats['misses'],
+                     _cache_stats['maxsize'], sum(map(len, _caches.values())))
+
+
+def cache_clear():
+    """Empty the keyword caches and reset their statistics."""
+    for cache in _caches.values():
+        cache.clear()
+    _cache_stats['hits'] = _cache_stats['misses'] = 0
+
+
+def set_cache_size(maxsize):
+    """Set the number of words the keyword cache holds, 0 disables it."""
+    _cache_stats['maxsize'] = maxsize
+    cache_clear()
+
+
+SQL_REGEX = [
+    (r'(--|# )\+.*?(\r\n|\r|\n|$)', tokens.Comment.Single.Hint),
+    (r'/\*\+[\s\S]*?\*/', tokens.Comment.Multiline.Hint),
+
+    (r'(--|# ).*?(\r\n|\r|\n|$)', tokens.Comment.Single),
+    (r'/\*[\s\S]*?\*/', tokens.Comment.Multiline),
+
+    (r'(\r\n|\r|\n)', tokens.Newline),
+    (r'\s+', tokens.Whitespace),
+
+    (r':=', tokens.Assignment),
+    (r'::', tokens.Punctuation),
+
+    (r'\*', tokens.Wildcard),
+
+    (r"`(``|[^`])*`", tokens.Name),
+    (r"´(´´|[^´])*´", tokens.Name),
+    (r'\$([_A-Z]\w*)?\$', tokens.Name.Builtin),
+
+    (r'\?', tokens.Name.Placeholder),
+    (r'%(\(\w+\))?s', tokens.Name.Placeholder),
+    (r'[$:?]\w+', tokens.Name.Placeholder),
+
+    # FIXME(andi): VALUES shouldn't be listed here
+    # see https://github.com/andialbrecht/sqlparse/pull/64
+    # IN is special, it may be followed by a parenthesis, but
+    # is never a functino, see issue183
+    (r'(CASE|IN|VALUES|USING)\b', tokens.Keyword),
+
+    (r'(@|##|#)[A-Z]\w+', tokens.Name),
+
+    # see issue #39
+    # Spaces around period `schema . name` are valid identifier
+    # TODO: Spaces before period not implemented
+    (r'[A-Z]\w*(?=\s*\.)', tokens.Name),  # 'Name'   .
+    (r'(?<=\.)[A-Z]\w*', tokens.Name),  # .'Name'
+    (r'[A-Z]\w*(?=\()', tokens.Name),  # side effect: change kw to func
+
+    # TODO: `1.` and `.1` are valid numbers
+    (r'-?0x[\dA-F]+', tokens.Number.Hexadecimal),
+    (r'-?\d*(\.\d+)?E-?\d+', tokens.Number.Float),
+    (r'-?\d*\.\d+', tokens.Number.Float),
+    (r'-?\d+', tokens.Number.Integer),
+
+    (r"'(''|\\\\|\\'|[^'])*'", tokens.String.Single),
+    # not a real string literal in ANSI SQL:
+    (r'(""|".*?[^\\]")', tokens.String.Symbol),
+    # sqlite names can be escaped with [square brackets]. left bracket
+    # cannot be preceded by word character or a right bracket --
+    # otherwise it's probably an array index
+    (r'(?<![\w\])])(\[[^\]]+\])', tokens.Name),
+    (r'((LEFT\s+|RIGHT\s+|FULL\s+)?(INNER\s+|OUTER\s+|STRAIGHT\s+)?'
+     r'|(CROSS\s+|NATURAL\s+)?)?JOIN\b', tokens.Keyword),
+    (r'END(\s+IF|\s+LOOP|\s+WHILE)?\b', tokens.Keyword),
+    (r'NOT\s+NULL\b', tokens.Keyword),
+    (r'CREATE(\s+OR\s+REPLACE)?\b', tokens.Keyword.DDL),
+    (r'DOUBLE\s+PRECISION\b', tokens.Name.Builtin),
+
+    (r'[_A-Z]\w*', is_keyword),
+
+    (r'[;:()\[\],\.]', tokens.Punctuation),
+    (r'[<>=~!]+', tokens.Operator.Comparison),
+    (r'[+/@#%^&|`?^-]+', tokens.Operator),
+]
 
 FLAGS = re.IGNORECASE | re.UNICODE
-SQL_REGEX = [(re.compile(rx, FLAGS).match, tt) for rx, tt in SQL_REGEX['root']]
 
 KEYWORDS = {
     'ABORT': tokens.Keyword,
@@ -275,7 +350,6 @@ KEYWORDS = {
     'GOTO': tokens.Keyword,
     'GRANT': tokens.Keyword,
     'GRANTED': tokens.Keyword,
-    'GRANULARITY': tokens.Keyword,
     'GROUPING': tokens.Keyword,
 
     'HANDLER': tokens.Keyword,
@@ -436,8 +510,6 @@ KEYWORDS = {
     'PROCEDURE': tokens.Keyword,
     'PUBLIC': tokens.Keyword,
 
-    'QINTERVAL': tokens.Keyword,
-
     'RAISE': tokens.Keyword,
     'RAW': tokens.Keyword,
     'READ': tokens.Keyword,
@@ -796,3 +868,16 @@ KEYWORDS_ORACLE = {
 
     'UNLIMITED': tokens.Keyword,
 }
+
+KEYWORDS_DRUID = {
+    'GRANULARITY': tokens.Keyword,
+    'QINTERVAL': tokens.Keyword,
+}
+
+# All keyword tables in one. Where a word appears in more than one table,
+# KEYWORDS_COMMON wins over KEYWORDS_ORACLE, which wins over KEYWORDS_DRUID
+# and KEYWORDS.
+_KEYWORDS_MERGED.update(KEYWORDS)
+_KEYWORDS_MERGED.update(KEYWORDS_DRUID)
+_KEYWORDS_MERGED.update(KEYWORDS_ORACLE)
+_KEYWORDS_MERGED.update(KEYWORDS_COMMON)
@@ -12,19 +12,880 @@
 # It's separated from the rest of pygments to increase performance
 # and to allow some customizations.
 
-from sqlparse import tokens
-from sqlparse.keywords import SQL_REGEX
-from sqlparse.compat import StringIO, string_types, u
-from sqlparse.utils import consume
+import bisect
+import codecs
+import mmap
+import re
+from array import array
+from functools import partial
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+from sqlparse import dialects, tokens
+from sqlparse.exceptions import SQLParseError
+from sqlparse.keywords import (
+    SQL_REGEX, FLAGS, KeywordOverlay, keyword_lookup)
+from sqlparse.compat import binary_types, string_types, text_type, u
+
+
+def _compile_rules(rules, flags=FLAGS):
+    """Compile a rule table into a single scanner.
+
+    *rules* is a list of ``(regex, action)`` pairs as found in
+    :data:`sqlparse.keywords.SQL_REGEX`. Each regex is wrapped in its own
+    capturing group and all of them are joined into one alternation.
+    Python's regex engine tries the alternatives from left to right and
+    stops at the first one that matches, which is exactly the priority
+    the rules have when tried one after another.
+
+    Returns a 2-tuple ``(match, actions)``. ``match`` is the bound
+    ``match`` method of the compiled alternation and ``actions`` maps the
+    index of the group that matched (``m.lastindex``) to the rule's
+    action.
+    """
+    parts = []
+    actions = {}
+    group = 1
+    for regex, action in rules:
+        parts.append('({0})'.format(regex))
+        actions[group] = action
+        # The outer group closes last, so it's always ``m.lastindex``.
+        group += re.compile(regex, flags).groups + 1
+    # An empty table must never match, not even the empty string.
+    return re.compile('|'.join(parts) or '(?!)', flags).match, actions
+
+
+_ASCII = [chr(i) for i in range(128)]
+
+_CATEGORIES = {
+    sre_parse.CATEGORY_DIGIT: r'\d',
+    sre_parse.CATEGORY_NOT_DIGIT: r'\D',
+    sre_parse.CATEGORY_SPACE: r'\s',
+    sre_parse.CATEGORY_NOT_SPACE: r'\S',
+    sre_parse.CATEGORY_WORD: r'\w',
+    sre_parse.CATEGORY_NOT_WORD: r'\W',
+}
+
+_REPEATS = tuple(getattr(sre_parse, name) for name in (
+    'MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT')
+    if hasattr(sre_parse, name))
+
+
+def _char_class(op, av):
+    """Return a regex matching the characters of a single-char node."""
+    if op is sre_parse.ANY:
+        return '.'
+    elif op is sre_parse.LITERAL:
+        return re.escape(u'%c' % av)
+    elif op is sre_parse.NOT_LITERAL:
+        return '[^{0}]'.format(re.escape(u'%c' % av))
+
+    negate, parts = '', []
+    for item_op, item_av in av:
+        if item_op is sre_parse.NEGATE:
+            negate = '^'
+        elif item_op is sre_parse.LITERAL:
+            parts.append(re.escape(u'%c' % item_av))
+        elif item_op is sre_parse.RANGE:
+            parts.append('{0}-{1}'.format(re.escape(u'%c' % item_av[0]),
+                                          re.escape(u'%c' % item_av[1])))
+        elif item_op is sre_parse.CATEGORY and item_av in _CATEGORIES:
+            parts.append(_CATEGORIES[item_av])
+        else:
+            return None
+    return '[{0}{1}]'.format(negate, ''.join(parts))
+
+
+def _first_chars(items, flags):
+    """Return the ASCII characters a parsed regex can start with.
+
+    Returns a 2-tuple ``(chars, nullable)`` where ``nullable`` tells if
+    *items* can match the empty string. Whenever a construct isn't
+    understood all characters are assumed, so the result is never too
+    small.
+    """
+    chars = set()
+    for op, av in items:
+        nullable = False
+        if op in (sre_parse.ANY, sre_parse.LITERAL,
+                  sre_parse.NOT_LITERAL, sre_parse.IN):
+            regex = _char_class(op, av)
+            if regex is None:
+                first = set(_ASCII)
+            else:
+                match = re.compile(regex, flags).match
+                first = set(c for c in _ASCII if match(c))
+        elif op is sre_parse.SUBPATTERN:
+            first, nullable = _first_chars(av[-1], flags)
+        elif op is getattr(sre_parse, 'ATOMIC_GROUP', None):
+            first, nullable = _first_chars(av, flags)
+        elif op is sre_parse.BRANCH:
+            first = set()
+            for branch in av[1]:
+                branch_first, branch_nullable = _first_chars(branch, flags)
+                first |= branch_first
+                nullable = nullable or branch_nullable
+        elif op in _REPEATS:
+            first, nullable = _first_chars(av[2], flags)
+            nullable = nullable or av[0] == 0
+        elif op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            # Zero-width: whatever follows decides the first character.
+            first, nullable = set(), True
+        else:
+            first, nullable = set(_ASCII), True
+
+        chars |= first
+        if not nullable:
+            return chars, False
+    return chars, True
+
+
+def _find_string_end(text, pos):
+    """Return the end of the string literal starting at *pos*.
+
+    Like the string rule, two quotes in a row and a quote preceded by an
+    odd number of backslashes don't end the string. Returns -1 if the
+    closing quote is missing.
+    """
+    start = pos + 1
+    while True:
+        quote = text.find("'", start)
+        if quote < 0:
+            return -1
+        backslash = quote
+        while backslash > start and text[backslash - 1] == '\\':
+            backslash -= 1
+        if (quote - backslash) % 2:
+            start = quote + 1
+        elif text.startswith("'", quote + 1):
+            start = quote + 2
+        else:
+            return quote + 1
+
+
+def _find_symbol_end(text, pos):
+    """Return the end of the quoted name starting at *pos*.
+
+    Like the symbol rule, the name ends at the first quote that doesn't
+    follow a backslash and only the character before that quote may be
+    a newline. Returns -1 if there's no such quote.
+    """
+    if text.startswith('"', pos + 1):
+        return pos + 2
+    start = pos + 1  # up to here, there's no newline
+    quote = text.find('"', pos + 2)
+    while quote > 0:
+        if text.find('\n', start, quote - 1) >= 0:
+            return -1
+        if text[quote - 1] != '\\':
+            return quote + 1
+        start = quote
+        quote = text.find('"', quote + 1)
+    return -1
+
+
+def _find_comment_end(text, pos):
+    """Return -1 if a multi-line comment starts at *pos* but never ends.
+
+    Otherwise ``None`` is returned and the rules decide what's there.
+    """
+    if text.startswith('/*', pos) and text.find('*/', pos + 2) < 0:
+        return -1
+    return None
+
+
+def _find_backtick_end(text, pos):
+    """Return the end of the backquoted name starting at *pos* or -1."""
+    start = pos + 1
+    while True:
+        quote = text.find('`', start)
+        if quote < 0:
+            return -1
+        if not text.startswith('`', quote + 1):
+            return quote + 1
+        start = quote + 2
+
+
+# Rules for long literals whose end is found with str.find() instead of
+# the regex, which has to keep state for every character on the way.
+# If there's no end, the regex still decides as it may match by
+# backtracking, e.g. a string ending in a backslash like 'C:\'. A
+# literal the regex doesn't match either becomes a single error token
+# reaching to the end of the input, or of the line if the literal can't
+# span lines. This way its end is searched for only once and not again
+# for every quote that follows.
+_LITERAL_RULES = {
+    r"'(''|\\\\|\\'|[^'])*'": (_find_string_end, True),
+    r'(""|".*?[^\\]")': (_find_symbol_end, False),
+    r"`(``|[^`])*`": (_find_backtick_end, True),
+    r'/\*\+[\s\S]*?\*/': (_find_comment_end, True),
+}
+
+
+class _LiteralMatch(object):
+    """The parts of a regex match object the lexer uses."""
+
+    __slots__ = ('string', 'pos', 'endpos', 'lastindex')
+
+    def __init__(self, string, pos, endpos, lastindex):
+        self.string = string
+        self.pos = pos
+        self.endpos = endpos
+        self.lastindex = lastindex
+
+    def group(self):
+        return self.string[self.pos:self.endpos]
+
+    def end(self):
+        return self.endpos
+
+
+# Where a literal that isn't terminated ends if it can't span lines, the
+# newline is a token of its own.
+_LINE_END = re.compile(r'[\r\n]').search
+
+
+def _literal_scanner(find_end, multiline, scanner, fallback=False):
+    """Wrap *scanner* so its first rule is matched by *find_end*.
+
+    *find_end* returns the end of the literal, -1 if it isn't terminated
+    or ``None`` to leave the decision to the rules. With *fallback*, a
+    literal that isn't terminated is still matched by the first rule if
+    it can.
+    """
+    match, actions = scanner
+    actions = dict(actions)
+    actions[0] = tokens.Error
+
+    def literal_match(text, pos):
+        end = find_end(text, pos)
+        if end is None:
+            return match(text, pos)
+        elif end >= 0:
+            return _LiteralMatch(text, pos, end, 1)
+        elif fallback:
+            # The literal ends with the character it starts with. Not
+            # looking beyond the last one keeps the regex from
+            # backtracking through runs of backslashes that follow it.
+            last = text.rfind(text[pos], pos + 1)
+            m = match(text, pos, last + 1) if last > 0 else None
+            if m and m.lastindex == 1:
+                return m
+
+        m = None if multiline else _LINE_END(text, pos)
+        return _LiteralMatch(text, pos, m.start() if m else len(text), 0)
+
+    return literal_match, actions
+
+
+class _Dispatch(dict):
+    """Maps characters to the scanner for tokens starting with them.
+
+    For every ASCII character only the rules that can possibly match at
+    a position starting with that character are kept, in their original
+    order. Characters sharing the same subset of rules share a scanner.
+    All other characters use a scanner with all rules. The values are
+    ``(match, actions)`` pairs like those returned by
+    :func:`_compile_rules`.
+
+    Compiling all scanners takes longer than importing the rest of the
+    package, so each one is compiled when it's first looked up.
+    """
+
+    def __init__(self, rules, flags=FLAGS):
+        super(_Dispatch, self).__init__()
+        self._rules = rules
+        self._flags = flags
+        self._firsts = None
+        self._scanners = {}  # by the indexes of their rules
+
+    def __missing__(self, char):
+        if char in _ASCII:
+            if self._firsts is None:
+                self._firsts = [self._first_chars(regex)
+                                for regex, _ in self._rules]
+            subset = tuple(i for i, first in enumerate(self._firsts)
+                           if char in first)
+        else:
+            subset = tuple(range(len(self._rules)))
+
+        if subset not in self._scanners:
+            self._scanners[subset] = self._compile(subset)
+        self[char] = scanner = self._scanners[subset]
+        return scanner
+
+    def _first_chars(self, regex):
+        items = sre_parse.parse(regex, self._flags)
+        chars, nullable = _first_chars(items, self._flags)
+        return set(_ASCII) if nullable else chars
+
+    def _compile(self, subset):
+        rules = [self._rules[i] for i in subset]
+        scanner = _compile_rules(rules, self._flags)
+        literal = rules and _LITERAL_RULES.get(rules[0][0])
+        if literal:
+            scanner = _literal_scanner(literal[0], literal[1], scanner,
+                                       fallback=True)
+        return scanner
+
+
+_DOLLAR_TAG = r'\$([_A-Z]\w*)?\$'
+
+
+def _find_dollar_end(text, pos):
+    """Return the end of the dollar-quoted string starting at *pos*.
+
+    The string ends with the same tag it starts with. Returns -1 if the
+    closing tag is missing and ``None`` if there's no tag at *pos*.
+    """
+    m = re.compile(_DOLLAR_TAG, FLAGS).match(text, pos)
+    if m is None:
+        return None
+    end = text.find(m.group(), m.end())
+    return -1 if end < 0 else end + len(m.group())
+
+
+class _LazyBodiesDispatch(_Dispatch):
+    """Like :class:`_Dispatch`, but lexes dollar-quoted strings at once.
+
+    A dollar-quoted string becomes a single ``String.Dollar`` token, so
+    function bodies can be tokenized later on, if ever.
+    """
+
+    def __missing__(self, char):
+        scanner = super(_LazyBodiesDispatch, self).__missing__(char)
+        if char == '$' and (_DOLLAR_TAG, tokens.Name.Builtin) \
+                in self._rules:
+            match, actions = _literal_scanner(_find_dollar_end, True, scanner)
+            # The tag rule is the first one for '$' and where it matches,
+            # so does _find_dollar_end().
+            actions[1] = tokens.String.Dollar
+            self[char] = scanner = match, actions
+        return scanner
+
+
+class _LayeredDispatch(dict):
+    """Like the dispatch table *base*, but with other rule actions.
+
+    *replace* maps actions of *base* to the ones to use instead. The
+    scanners of *base* are shared, nothing is compiled again.
+    """
+
+    def __init__(self, base, replace):
+        super(_LayeredDispatch, self).__init__()
+        self._base = base
+        self._replace = replace
+
+    def __missing__(self, char):
+        match, actions = self._base[char]
+        replace = self._replace
+        actions = dict((idx, replace.get(action, action))
+                       for idx, action in actions.items())
+        self[char] = scanner = match, actions
+        return scanner
+
+
+_SQL_DISPATCH = _Dispatch(SQL_REGEX)
+_LAZY_DISPATCH = _LazyBodiesDispatch(SQL_REGEX)
+
+# Dispatch tables by dialect and whether bodies are lexed lazily.
+_DISPATCHES = {
+    (dialects.GENERIC, False): _SQL_DISPATCH,
+    (dialects.GENERIC, True): _LAZY_DISPATCH,
+}
+
+
+def _get_dispatch(dialect=None, lazy_bodies=False):
+    """Return the dispatch table for *dialect* (a name or instance)."""
+    key = dialects.get(dialect or 'generic'), lazy_bodies
+    dispatch = _DISPATCHES.get(key)
+    if dispatch is None:
+        cls = _LazyBodiesDispatch if lazy_bodies else _Dispatch
+        dispatch = _DISPATCHES[key] = cls(key[0].rules)
+    return dispatch
+
+
+#: Number of characters read from a stream at once.
+CHUNK_SIZE = 64 * 1024
+
+# When lexing a stream, a token is only emitted once at least this many
+# characters follow it in the buffer. Apart from the token bodies and
+# the runs of words below, no rule looks further ahead than that.
+_LOOKAHEAD = 1024
+
+_WORD_CHAR = re.compile(r'\w', re.UNICODE).match
+
+
+def _words_start(text, end):
+    """Return where the words at the end of ``text[:end]`` start.
+
+    Rules for words can match the words following them together with any
+    amount of whitespace in between (LEFT OUTER JOIN, NOT NULL) or look
+    past the whitespace following a name for a period. So a token that
+    starts one of the last three words, counting a word cut off at
+    *end*, may continue beyond *end*. Returns *end* if ``text[:end]``
+    doesn't end in a word and whitespace.
+    """
+    start = pos = end
+    for _ in range(3):
+        while pos and text[pos - 1].isspace():
+            pos -= 1
+        word = pos
+        while pos and _WORD_CHAR(text[pos - 1]):
+            pos -= 1
+        if pos == word:
+            break
+        start = pos
+    return start
+
+
+def _regex_body(regex):
+    def body_end(text, pos):
+        # re caches compiled patterns, no need to compile them up front
+        m = re.compile(regex, FLAGS).match(text, pos)
+        return m.end() if m else pos
+    return body_end
+
+
+def _literal_body(find_end):
+    def body_end(text, pos):
+        end = find_end(text, pos)
+        return len(text) if end < 0 else end
+    return body_end
+
+
+# Tokens that can be arbitrarily long, keyed by their first character.
+# Each function returns how far the opening of such a token and as much
+# of its body as possible extend; if that's the end of the buffer, the
+# end of the token is not known yet.
+_BODIES = {
+    "'": _literal_body(_find_string_end),
+    '"': _regex_body(r'"(\\"|[^"\n])*'),
+    '`': _literal_body(_find_backtick_end),
+    u'´': _regex_body(u'´(´´|[^´])*'),
+    '[': _regex_body(r'\[[^\]]*'),
+    '/': _regex_body(r'/\*([^*]|\*(?!/))*'),
+}
+
+
+def _lex(text, pos=0, safe=None, dispatch=_SQL_DISPATCH):
+    """Generate ``(tokentype, value)`` pairs for *text* from *pos* on.
+
+    If *safe* is given, *text* is only the beginning of the input and
+    lexing stops at the first token that extends beyond *safe* and may
+    therefore continue in the input that is yet to come.
+
+    Consecutive characters no rule matches are yielded as a single
+    ``Error`` token, together with unterminated literals. Only when
+    *safe* is given, such a run may be split into several adjacent
+    ``Error`` tokens. *dispatch* maps characters to the scanners used
+    for tokens starting with them.
+    """
+    end = len(text)
+    error = None  # start of the current run of unmatched characters
+    while pos < end:
+        char = text[pos]
+        match, actions = dispatch[char]
+        m = match(text, pos)
+
+        if safe is not None:
+            stop = m.end() if m else pos + 1
+            if char in _BODIES:
+                stop = max(stop, _BODIES[char](text, pos))
+            if stop > safe:
+                if error is not None:
+                    yield tokens.Error, text[error:pos]
+                return
+
+        action = actions[m.lastindex] if m else tokens.Error
+        if action is tokens.Error:
+            # Unterminated literals join the run of unmatched characters.
+            if error is None:
+                error = pos
+            pos = m.end() if m else pos + 1
+            continue
+        if error is not None:
+            yield tokens.Error, text[error:pos]
+            error = None
+
+        if isinstance(action, tokens._TokenType):
+            yield action, m.group()
+        elif callable(action):
+            yield action(m.group())
+        pos = m.end()
+    if error is not None:
+        yield tokens.Error, text[error:]
+
+
+#: Dump modes a :class:`Lexer` can be put in.
+DUMP_MODES = ('copy', 'delimiter')
+
+_DELIMITER_COMMAND = re.compile(r'DELIMITER[ \t]+\S[^\r\n]*', FLAGS)
+
+
+def _find_copy_end(text, pos):
+    """Return the end of the COPY data starting at *pos*.
+
+    The data ends with a line holding only ``\\.``. Returns the end of
+    *text* if there's no such line.
+    """
+    idx = pos
+    while True:
+        idx = text.find(u'\n\\.', idx)
+        if idx < 0:
+            return len(text)
+        idx += 3
+        if idx == len(text) or text[idx] in u'\r\n':
+            return idx
+
+
+class _DumpState(object):
+    """What the lexer has to know about the input in dump modes.
+
+    In ``copy`` mode, the rows following ``COPY ... FROM stdin;`` up to
+    the ``\\.`` line become a single ``Other`` token. In ``delimiter``
+    mode, ``DELIMITER`` commands of the MySQL client become a single
+    ``Keyword.Command`` token and the delimiter they set is a
+    ``Punctuation`` token wherever a token could start.
+    """
+
+    def __init__(self, modes):
+        self._copy_mode = 'copy' in modes
+        self._commands = 'delimiter' in modes
+        self.delimiter = u';'
+        self.at_start = True  # no significant token in the statement yet
+        # 1: COPY, 2: COPY ... FROM, 3: COPY ... FROM STDIN
+        self._copy = 0
+        self._data = False  # the COPY data follows
+
+    def special(self, text, pos):
+        """Return ``(tokentype, end)`` for a token at *pos* that isn't
+        lexed by the rules, or ``None``."""
+        if self._data:
+            return tokens.Other, _find_copy_end(text, pos)
+        if self.delimiter != u';' and text.startswith(self.delimiter, pos):
+            return tokens.Punctuation, pos + len(self.delimiter)
+        if self.at_start and self._commands:
+            m = _DELIMITER_COMMAND.match(text, pos)
+            if m:
+                return tokens.Keyword.Command, m.end()
+        return None
+
+    def feed(self, ttype, value):
+        """Update the state for a token.
+
+        Returns ``True`` if :meth:`special` has to look at the text
+        following the token.
+        """
+        if ttype is tokens.Punctuation and value == self.delimiter:
+            self._data = self._copy == 3
+            self._copy = 0
+            self.at_start = True
+        elif ttype is tokens.Other:
+            self._data = False
+        elif ttype is tokens.Keyword.Command:
+            self.delimiter = value.split()[1]
+        elif ttype in tokens.Whitespace or ttype in tokens.Comment:
+            pass
+        elif self.at_start:
+            self.at_start = False
+            if self._copy_mode and ttype in tokens.Keyword \
+                    and value.upper() == 'COPY':
+                self._copy = 1
+        elif self._copy:
+            word = value.upper() if ttype in tokens.Keyword else None
+            if self._copy == 2:
+                self._copy = 3 if word == 'STDIN' else 1
+            elif word == 'FROM':
+                self._copy = 2
+        return (self._data or self.delimiter != u';'
+                or self.at_start and self._commands)
+
+
+def _lex_dump(text, pos=0, safe=None, dispatch=_SQL_DISPATCH, state=None):
+    """Like :func:`_lex`, but in the dump modes *state* keeps track of.
+
+    *state* is a :class:`_DumpState` that lasts for the whole input.
+    """
+    end = len(text)
+    while pos < end:
+        special = state.special(text, pos)
+        if special is not None:
+            ttype, stop = special
+            if safe is not None and stop > safe:
+                return
+            value = text[pos:stop]
+            yield ttype, value
+            state.feed(ttype, value)
+            pos = stop
+            continue
+
+        for ttype, value in _lex(text, pos, safe, dispatch):
+            pos += len(value)
+            yield ttype, value
+            if state.feed(ttype, value):
+                break
+        else:
+            return
+
+
+# Byte order marks and the encodings they stand for. UTF-32 comes first
+# as its little-endian mark starts with the one of UTF-16.
+_BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+
+def _as_bytes(data):
+    """Return the bytes-like *data* as bytes.
+
+    The Python 2 codecs don't accept memoryview objects and bytes()
+    returns their repr there.
+    """
+    return data.tobytes() if isinstance(data, memoryview) else bytes(data)
+
+
+class _BOMDecoder(object):
+    """Incremental decoder for input with an optional byte order mark.
+
+    The encoding is taken from the byte order mark, input without one
+    is decoded as UTF-8. The encoding is known as ``encoding`` once
+    the first bytes are decoded.
+    """
+
+    def __init__(self):
+        self._head = b''
+        self._decoder = None
+        self.encoding = None
+
+    def decode(self, data, final=False):
+        if self._decoder is None:
+            self._head += _as_bytes(data)
+            if len(self._head) < 4 and not final:
+                return u''
+            self.encoding = next((encoding for bom, encoding in _BOMS
+                                  if self._head.startswith(bom)), 'utf-8')
+            self._decoder = codecs.getincrementaldecoder(self.encoding)()
+            data, self._head = self._head, None
+        return self._decoder.decode(data, final)
+
+
+def _get_decoder(encoding=None):
+    """Return an incremental decoder, see :class:`_BOMDecoder`."""
+    if encoding is None:
+        return _BOMDecoder()
+    return codecs.getincrementaldecoder(encoding)()
+
+
+# The encodings of the text following each byte order mark.
+_BOM_FREE = [
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+]
+
+
+def _file_encoding(path, encoding=None):
+    """Return the encoding of the file at *path* and where its text starts.
+
+    Encodings with a byte order mark are replaced by the encoding they
+    stand for without one, so any byte range of the text can be decoded.
+    """
+    name = codecs.lookup(encoding or 'utf-8-sig').name
+    if name not in ('utf-8-sig', 'utf-16', 'utf-32'):
+        return encoding, 0
+    with open(path, 'rb') as f:
+        head = f.read(4)
+    for bom, encoding in _BOM_FREE:
+        if head.startswith(bom):
+            return encoding, len(bom)
+    return 'utf-8' if name == 'utf-8-sig' else name, 0
+
+
+class _BufferReader(object):
+    """File-like access to a bytes-like object, only the chunks read are
+    copied."""
+
+    def __init__(self, data):
+        self._view = memoryview(data)
+        self._pos = 0
+
+    def read(self, size=-1):
+        start = self._pos
+        self._pos = len(self._view) if size < 0 else start + size
+        return self._view[start:self._pos].tobytes()
+
+
+def _text(sql, encoding=None):
+    """Return *sql* as text, bytes-like objects are decoded."""
+    if isinstance(sql, binary_types):
+        return _get_decoder(encoding).decode(_as_bytes(sql), True)
+    return u(sql, encoding)
+
+
+def _lex_stream(stream, encoding=None, dispatch=_SQL_DISPATCH, decoder=None,
+                dump=None):
+    """Generate ``(tokentype, value)`` pairs for a file-like object.
+
+    The stream is read in chunks of :data:`CHUNK_SIZE` characters (or
+    bytes, which are decoded incrementally using *encoding* or, if it's
+    not given, the encoding of the byte order mark or UTF-8). Only the
+    part of the input that couldn't be tokenized yet is kept in memory.
+    Bytes are decoded with *decoder*, if given. If *dump* is given, it's
+    the :class:`_DumpState` to lex with.
+    """
+    lex = _lex if dump is None else partial(_lex_dump, state=dump)
+    text, pos, size = u'', 0, CHUNK_SIZE
+    error = []  # pieces of a run of unmatched characters
+    while True:
+        data = stream.read(size)
+        eof = not data
+        if not isinstance(data, text_type):
+            if decoder is None:
+                decoder = _get_decoder(encoding)
+            data = decoder.decode(data, eof)
+
+        # Keep one character of context for the look-behind rules.
+        keep = min(pos, 1)
+        text, pos = text[pos - keep:] + data, keep
+        safe = None if eof else min(len(text.rstrip()) - _LOOKAHEAD,
+                                    _words_start(text, len(text)))
+
+        start = pos
+        for ttype, value in lex(text, pos, safe, dispatch):
+            pos += len(value)
+            # Rejoin runs of unmatched characters split between buffers.
+            if ttype is tokens.Error:
+                error.append(value)
+                continue
+            if error:
+                yield tokens.Error, u''.join(error)
+                error = []
+            yield ttype, value
+
+        if eof:
+            if error:
+                yield tokens.Error, u''.join(error)
+            return
+        # If a single token fills the whole buffer, read bigger chunks.
+        size = CHUNK_SIZE if pos > start else size * 2
+
+
+def _lex_file(path, encoding=None, dispatch=_SQL_DISPATCH, dump=None):
+    """Generate ``(tokentype, value)`` pairs for the file at *path*.
+
+    The file is memory-mapped and lexed region by region, so neither
+    the raw nor the decoded contents are ever copied as a whole.
+    """
+    with open(path, 'rb') as f:
+        try:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty files can't be mapped
+            return
+        try:
+            for token in _lex_stream(mapping, encoding, dispatch,
+                                     dump=dump):
+                yield token
+        finally:
+            mapping.close()
+
+
+def _keyword_rule(ttype, keywords):
+    """Return an action for a rule matching words of type *ttype*.
+
+    The words it matches get the type *keywords* has for them, if any.
+    Words separated by whitespace are looked up with single spaces.
+    """
+    def action(value):
+        return keywords.get(u' '.join(value.upper().split()), ttype), value
+    return action
+
+
+class _ClassOrInstanceMethod(object):
+    """A method that, when called on the class, uses an instance created
+    without arguments."""
+
+    def __init__(self, func):
+        self._func = func
+        self.__doc__ = func.__doc__
+
+    def __get__(self, obj, cls=None):
+        return self._func.__get__(cls() if obj is None else obj, cls)
 
 
 class Lexer(object):
-    """Lexer
-    Empty class. Leaving for backwards-compatibility
+    """Lexer for *dialect*, the name of a registered dialect or a
+    :class:`~sqlparse.dialects.Dialect` instance (``'generic'`` if not
+    given).
+
+    *keywords* maps words to token types. They're added to the keywords
+    of the dialect, or override the token types the dialect has for them.
+    Words the dialect has rules of their own for, like ``JOIN`` or
+    ``NOT NULL``, are overridden as they're matched: ``LEFT OUTER JOIN``
+    only by ``'LEFT OUTER JOIN'`` and not by ``'JOIN'``. Lexers share
+    the compiled rules of their dialect and only keep their own
+    keywords, so there can be any number of them.
+
+    *dump_modes* are the names of the dump formats to recognize, see
+    :data:`DUMP_MODES`:
+
+    ``copy``
+      The rows following ``COPY ... FROM stdin;`` in ``pg_dump`` output
+      are returned as a single ``Other`` token up to and including the
+      closing ``\\.`` line, without being lexed.
+    ``delimiter``
+      The ``DELIMITER`` commands in ``mysqldump`` output are returned as
+      a single ``Keyword.Command`` token each and the delimiter they set
+      as a ``Punctuation`` token. :class:`~sqlparse.engine.StatementSplitter`
+      ends statements there instead of at semicolons.
     """
 
-    @staticmethod
-    def get_tokens(text, encoding=None):
+    def __init__(self, dialect=None, keywords=None, dump_modes=None):
+        self.dialect = dialects.get(dialect or 'generic')
+        self.keywords = dict((word.upper(), ttype)
+                             for word, ttype in (keywords or {}).items())
+        self.dump_modes = frozenset(dump_modes or ())
+        for mode in self.dump_modes - set(DUMP_MODES):
+            raise SQLParseError('Unknown dump mode: {0!r}'.format(mode))
+        self._dispatches = {}
+        if self.keywords:
+            lookup = keyword_lookup(
+                KeywordOverlay(self.keywords, self.dialect.keywords))
+            self._replace = {self.dialect.is_keyword: lookup}
+            for _, action in self.dialect.rules:
+                if isinstance(action, tokens._TokenType) and (
+                        action in tokens.Keyword
+                        or action is tokens.Name.Builtin):
+                    self._replace[action] = _keyword_rule(action,
+                                                          self.keywords)
+
+    def __reduce__(self):
+        return Lexer, (self.dialect, self.keywords, self.dump_modes)
+
+    def _get_dump(self):
+        return _DumpState(self.dump_modes) if self.dump_modes else None
+
+    def _get_dispatch(self, lazy_bodies=False):
+        dispatch = _get_dispatch(self.dialect, lazy_bodies)
+        if not self.keywords:
+            return dispatch
+        layered = self._dispatches.get(lazy_bodies)
+        if layered is None:
+            layered = self._dispatches[lazy_bodies] = _LayeredDispatch(
+                dispatch, self._replace)
+        return layered
+
+    @_ClassOrInstanceMethod
+    def get_tokens(self, text, encoding=None, lazy_bodies=False):
         """
         Return an iterable of (tokentype, value) pairs generated from
         `text`. If `unfiltered` is set to `True`, the filtering mechanism
@@ -36,34 +897,245 @@ class Lexer(object):
         Split ``text`` into (tokentype, text) pairs.
 
         ``stack`` is the inital stack (default: ``['root']``)
+
+        ``text`` may also be a text or binary file-like object. It's
+        read in chunks, so the input never has to be in memory at once.
+        Bytes-like objects are decoded chunk by chunk as well. Without
+        ``encoding``, binary input is decoded as UTF-8 unless it starts
+        with a byte order mark.
+        A path-like object (e.g. :class:`pathlib.Path`) is lexed from a
+        memory map of the file.
+
+        If ``lazy_bodies`` is ``True``, dollar-quoted strings like
+        function bodies are returned as a single ``String.Dollar``
+        token instead of being tokenized.
+
+        Like in earlier versions, it can be called on the class as well,
+        ``Lexer.get_tokens(text)`` uses a lexer for the generic dialect.
         """
-        if isinstance(text, string_types):
+        dispatch = self._get_dispatch(lazy_bodies)
+        dump = self._get_dump()
+        if isinstance(text, binary_types):
+            return _lex_stream(_BufferReader(text), encoding, dispatch,
+                               dump=dump)
+        elif isinstance(text, string_types):
             text = u(text, encoding)
-        elif isinstance(text, StringIO):
-            text = u(text.read(), encoding)
-
-        iterable = enumerate(text)
-        for pos, char in iterable:
-            for rexmatch, action in SQL_REGEX:
-                m = rexmatch(text, pos)
-
-                if not m:
-                    continue
-                elif isinstance(action, tokens._TokenType):
-                    yield action, m.group()
-                elif callable(action):
-                    yield action(m.group())
-
-                consume(iterable, m.end() - pos - 1)
-                break
-            else:
-                yield tokens.Error, char
+        elif hasattr(text, 'read'):
+            return _lex_stream(text, encoding, dispatch, dump=dump)
+        elif hasattr(text, '__fspath__'):
+            return _lex_file(text.__fspath__(), encoding, dispatch, dump)
+        if dump is not None:
+            return _lex_dump(text, dispatch=dispatch, state=dump)
+        return _lex(text, dispatch=dispatch)
+
+    def scan(self, sql, on_token, encoding=None, lazy_bodies=False):
+        """Call ``on_token(ttype, start, end)`` for each token of *sql*.
 
+        See :func:`scan`.
+        """
+        text = _text(sql, encoding)
+        dispatch = self._get_dispatch(lazy_bodies)
+        dump = self._get_dump()
+        if dump is None:
+            _scan(text, 0, on_token, dispatch=dispatch)
+            return
+        pos = 0
+        for ttype, value in _lex_dump(text, dispatch=dispatch, state=dump):
+            on_token(ttype, pos, pos + len(value))
+            pos += len(value)
 
-def tokenize(sql, encoding=None):
+
+def tokenize(sql, encoding=None, lazy_bodies=False, dialect=None):
     """Tokenize sql.
 
     Tokenize *sql* using the :class:`Lexer` and return a 2-tuple stream
     of ``(token type, value)`` items.
     """
-    return Lexer().get_tokens(sql, encoding)
+    return Lexer(dialect).get_tokens(sql, encoding, lazy_bodies)
+
+
+class TokenColumns(object):
+    """A token stream stored as parallel arrays.
+
+    ``ttypes`` holds the ``id`` of each token's type, ``starts`` and
+    ``ends`` hold its offsets in ``text``. Token values are sliced from
+    ``text`` only when asked for.
+    """
+
+    __slots__ = ('text', 'ttypes', 'starts', 'ends', 'reaches')
+
+    #: All token types, indexed by their id.
+    types = tokens._registry
+
+    def __init__(self, text, ttypes, starts, ends, reaches=None):
+        self.text = text
+        self.ttypes = ttypes
+        self.starts = starts
+        self.ends = ends
+        # Offsets of the characters whose lexing depended on input after
+        # the end of their token, mapped to how far that input reaches.
+        self.reaches = {} if reaches is None else reaches
+
+    def __len__(self):
+        return len(self.ttypes)
+
+    def __getitem__(self, idx):
+        return self.types[self.ttypes[idx]], self.value(idx)
+
+    def __iter__(self):
+        for idx in range(len(self.ttypes)):
+            yield self[idx]
+
+    def value(self, idx):
+        """Returns the value of the token at *idx*."""
+        return self.text[self.starts[idx]:self.ends[idx]]
+
+    def type_id(self, ttype):
+        """Returns the id used for *ttype* in ``ttypes``."""
+        return ttype.id
+
+
+def _scan(text, pos, on_token, resync=None, reaches=None,
+          dispatch=_SQL_DISPATCH):
+    """Call ``on_token(ttype, start, end)`` for the tokens of *text*.
+
+    Lexing starts at *pos*. If *resync* is given, it's called with the
+    start of each token and lexing stops as soon as it returns true.
+    If *reaches* is given, it's updated like ``TokenColumns.reaches``.
+    Returns the position where lexing stopped.
+    """
+    end = len(text)
+    error = None  # start of the current run of unmatched characters
+    while pos < end:
+        if resync is not None and error is None and resync(pos):
+            return pos
+        char = text[pos]
+        match, actions = dispatch[char]
+        m = match(text, pos)
+
+        if reaches is not None and char in _BODIES:
+            reach = _BODIES[char](text, pos)
+            if reach > (m.end() if m else pos + 1):
+                reaches[pos] = reach
+
+        action = actions[m.lastindex] if m else tokens.Error
+        if action is tokens.Error:
+            # Unterminated literals join the run of unmatched characters.
+            if error is None:
+                error = pos
+            pos = m.end() if m else pos + 1
+            continue
+        if error is not None:
+            on_token(tokens.Error, error, pos)
+            error = None
+
+        if not isinstance(action, tokens._TokenType):
+            action = action(m.group())[0]
+        stop = m.end()
+        on_token(action, pos, stop)
+        pos = stop
+    if error is not None:
+        on_token(tokens.Error, error, pos)
+    return pos
+
+
+def scan(sql, on_token, encoding=None):
+    """Tokenize sql and call *on_token* for each token.
+
+    *on_token* is called with ``(ttype, start, end)``: the token type
+    and the offsets of the token in *sql* (after decoding it, if it
+    isn't text already). Unlike :func:`tokenize`, no tuples or other
+    objects are created for the tokens, so this is the cheapest way to
+    look for certain tokens or to count them.
+    """
+    _scan(_text(sql, encoding), 0, on_token)
+
+
+def _lex_columns(text, pos, columns, resync=None):
+    """Append the tokens of *text* from *pos* on to *columns*.
+
+    Returns the position where lexing stopped, see :func:`_scan`.
+    """
+    ttype_ids = columns.ttypes.append
+    starts, ends = columns.starts.append, columns.ends.append
+
+    def on_token(ttype, start, end):
+        ttype_ids(ttype.id)
+        starts(start)
+        ends(end)
+    return _scan(text, pos, on_token, resync, columns.reaches)
+
+
+def tokenize_columnar(sql, encoding=None):
+    """Tokenize sql into arrays.
+
+    Like :func:`tokenize`, but instead of a stream of 2-tuples a
+    :class:`TokenColumns` instance is returned. It needs a few bytes per
+    token and no Python object is created for the tokens themselves.
+    """
+    text = _text(sql, encoding)
+    columns = TokenColumns(text, array('H'), array('I'), array('I'))
+    _lex_columns(text, 0, columns)
+    return columns
+
+
+def retokenize(columns, start, end, new_text):
+    """Tokenize the text of *columns* after an edit.
+
+    *columns* is a :class:`TokenColumns` instance as returned by
+    :func:`tokenize_columnar` and the edit replaces ``text[start:end]``
+    with *new_text*. Only the tokens around the edit are lexed again:
+    from the last token that can't be affected by it until the new
+    tokens line up with the old ones. A new :class:`TokenColumns`
+    instance is returned, *columns* is left alone.
+    """
+    old = columns.text
+    text = old[:start] + new_text + old[end:]
+    delta = len(new_text) - (end - start)
+    edited = start + len(new_text)
+
+    # Like the stream lexer, assume no rule looks further than
+    # _LOOKAHEAD characters beyond trailing whitespace and the last
+    # words unless it's recorded in columns.reaches.
+    safe = min(len(old[:start].rstrip()) - _LOOKAHEAD,
+               _words_start(old, start))
+    restart = min([safe] + [pos for pos, reach in columns.reaches.items()
+                            if reach > safe])
+    idx = max(bisect.bisect_right(columns.starts, restart) - 1, 0)
+    # Runs of unmatched characters might grow into the next token.
+    if idx and columns.ttypes[idx - 1] == tokens.Error.id:
+        idx -= 1
+    pos = columns.starts[idx] if idx < len(columns) else 0
+
+    result = TokenColumns(
+        text, columns.ttypes[:idx], columns.starts[:idx],
+        columns.ends[:idx], dict((offset, reach) for offset, reach
+                                 in columns.reaches.items() if offset < pos))
+
+    old_starts, old_count = columns.starts, len(columns)
+    following = [bisect.bisect_left(old_starts, edited + 1 - delta)]
+
+    def resync(offset):
+        # Tokens starting at the same text with the same character
+        # before them are lexed the same way as before.
+        if offset <= edited:
+            return False
+        idx = following[0]
+        while idx < old_count and old_starts[idx] < offset - delta:
+            idx += 1
+        following[0] = idx
+        return idx < old_count and old_starts[idx] == offset - delta
+
+    pos = _lex_columns(text, pos, result, resync)
+    if pos < len(text):
+        idx = following[0]
+        starts = array('I', (start + delta for start in old_starts[idx:]))
+        result.ttypes.extend(columns.ttypes[idx:])
+        result.starts.extend(starts)
+        # Tokens are contiguous, each one ends where the next starts.
+        result.ends.extend(starts[1:])
+        result.ends.append(len(text))
+        for offset, reach in columns.reaches.items():
+            if offset >= old_starts[idx]:
+                result.reaches[offset + delta] = reach + delta
+    return result
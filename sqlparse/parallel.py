@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2016 Andi Albrecht, albrecht.andi@gmail.com
+#
+# This module is part of python-sqlparse and is released under
+# the BSD License: http://www.opensource.org/licenses/bsd-license.php
+
+"""Parse large files with several processes.
+
+The file is cut into byte ranges of a few MB at line starts, one per
+task. The calling process reads the file once to cut it and to count
+where each range starts. Only a few tasks per process are submitted at
+a time, so the results come back in order with bounded memory. A task
+lexes its range as if a statement started there, skips to the first
+statement boundary it finds and parses the statements starting before
+the end of its range. A string, comment or dollar-quoted body
+crossing the cut can make the boundary found a wrong guess. So the
+results of a task are only used from the first boundary that is known
+to be right. The statements before that boundary are parsed again in
+the calling process.
+"""
+
+import bisect
+import codecs
+import collections
+import itertools
+import multiprocessing
+import os
+
+from sqlparse import sql
+from sqlparse.compat import text_type
+from sqlparse.engine import grouping
+from sqlparse.engine.statement_splitter import StatementSplitter
+from sqlparse.lexer import CHUNK_SIZE, Lexer, _file_encoding
+
+
+# A task parses a range of about RANGE_SIZE bytes. At most
+# RANGES_PER_PROCESS tasks for each process are submitted and not yet
+# consumed, that's the bound of the memory used for the results.
+RANGE_SIZE = 4 * 1024 * 1024
+RANGES_PER_PROCESS = 4
+
+
+def _ranges(path, start, size, encoding, range_size):
+    """Generate ``(start, stop, position)`` for the byte ranges of the
+    file at *path*.
+
+    The ranges are cut at the first line start after *range_size* bytes.
+    Their :class:`~sqlparse.sql.Position` counts from byte *start*,
+    where the text of the file starts.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    position = sql.Position(0, 1, 1)
+    offset, line = 0, 1
+    begin = pos = start
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while pos < size:
+            data = f.read(min(CHUNK_SIZE, size - pos))
+            if not data:
+                break
+            i = 0
+            while begin + range_size <= pos + len(data):
+                j = data.find(b'\n', max(begin + range_size - pos - 1, i))
+                if j < 0:
+                    break
+                j += 1
+                offset += len(decoder.decode(data[i:j]))
+                line += data.count(b'\n', i, j)
+                yield begin, pos + j, position
+                begin, position = pos + j, sql.Position(offset, line, 1)
+                i = j
+            offset += len(decoder.decode(data[i:]))
+            line += data.count(b'\n', i)
+            pos += len(data)
+    if begin < pos:
+        yield begin, pos, position
+
+
+def _statements(path, start, encoding, dialect, lazy_bodies, position):
+    """Generate ``(start, end, statement)`` for the file at *path*.
+
+    Lexing starts at byte *start* as if a statement started there, at
+    *position* of the text. The statements aren't grouped.
+    """
+    lexer = Lexer(dialect)
+    with open(path, 'rb') as f:
+        f.seek(start)
+        tokens = lexer.get_tokens(f, encoding, lazy_bodies)
+        for stmt in StatementSplitter(lexer, position).process(tokens):
+            end = start + len(text_type(stmt).encode(encoding))
+            yield start, end, stmt
+            start = end
+
+
+def _parse(stmt, func):
+    stmt = grouping.group(stmt)
+    return stmt if func is None else func(stmt)
+
+
+def _parse_range(task):
+    """Parse the statements starting in a range of a file.
+
+    Returns the offsets of the statements, the offset and position of
+    the first statement after the range (``None`` at the end of the file)
+    and the results for the statements.
+    """
+    (path, start, stop, position, encoding, dialect, lazy_bodies,
+     func) = task
+    offsets, results = [], []
+    statements = _statements(path, start, encoding, dialect, lazy_bodies,
+                             position)
+    if position.offset:
+        # Whatever precedes the first boundary found belongs to a
+        # statement starting in an earlier range.
+        next(statements, None)
+    for offset, _, stmt in statements:
+        if offset >= stop:
+            return offsets, (offset, stmt.get_position()), results
+        offsets.append(offset)
+        results.append(_parse(stmt, func))
+    return offsets, None, results
+
+
+def _imap(pool, func, tasks, window):
+    """Like ``pool.imap()``, but with at most *window* tasks submitted
+    whose results weren't consumed yet."""
+    pending = collections.deque()
+    for task in tasks:
+        pending.append(pool.apply_async(func, (task,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def parse(path, func=None, processes=None, encoding=None, dialect=None,
+          lazy_bodies=False):
+    """Parse the statements of the file at *path* using several processes.
+
+    :param path: The path of the file.
+    :param func: A function the statements are passed to once they're
+        parsed (optional). Its results are returned instead of the
+        statements and, like the function itself, must be picklable.
+        Returning only what's needed saves sending whole statements
+        between processes.
+    :param processes: The number of processes, defaults to the number
+        of CPUs.
+    :param encoding: The encoding of the file (optional). Without it, the
+        byte order mark decides, UTF-8 is the default. Only files in
+        encodings where a newline is the byte ``\\n`` are processed in
+        parallel.
+    :param dialect: The name of the SQL dialect (optional). See
+        :func:`sqlparse.parse`.
+    :param lazy_bodies: See :func:`sqlparse.parse`.
+    :returns: A generator of the statements (or the results of *func*)
+        in the order they appear in the file.
+    """
+    encoding, start = _file_encoding(path, encoding)
+    size = os.path.getsize(path)
+    processes = processes or multiprocessing.cpu_count()
+    if u'\n'.encode(encoding) != b'\n':
+        processes = 1
+
+    # Small files are still cut into several ranges for each process.
+    range_size = max(1, min(RANGE_SIZE, (size - start) // (
+        processes * RANGES_PER_PROCESS)))
+    ranges = _ranges(path, start, size, encoding, range_size)
+    head = list(itertools.islice(ranges, 2)) if processes > 1 else []
+    origin = sql.Position(0, 1, 1)
+    if len(head) < 2:
+        ranges.close()
+        for _, _, stmt in _statements(path, start, encoding, dialect,
+                                      lazy_bodies, origin):
+            yield _parse(stmt, func)
+        return
+
+    tasks = ((path, cut, stop, position, encoding, dialect, lazy_bodies,
+              func)
+             for cut, stop, position in itertools.chain(head, ranges))
+    pool = multiprocessing.Pool(processes)
+    try:
+        pos, position = start, origin  # where the next statement starts
+        statements = None  # parses from pos on in this process
+        for offsets, end, results in _imap(
+                pool, _parse_range, tasks, processes * RANGES_PER_PROCESS):
+            end, end_position = end or (size, None)
+            while pos < end:
+                idx = bisect.bisect_left(offsets, pos)
+                if idx < len(offsets) and offsets[idx] == pos:
+                    # The task found a boundary that is known to be right
+                    # and so are all the statements from there on.
+                    for result in results[idx:]:
+                        yield result
+                    pos, position, statements = end, end_position, None
+                    break
+
+                if statements is None:
+                    statements = _statements(path, pos, encoding, dialect,
+                                             lazy_bodies, position)
+                _, pos, stmt = next(statements, (None, size, None))
+                if stmt is not None:
+                    yield _parse(stmt, func)
+    finally:
+        pool.terminate()
@@ -8,7 +8,10 @@
 """This module contains classes representing syntactical elements of SQL."""
 from __future__ import print_function
 
+import bisect
 import re
+from array import array
+from collections import namedtuple
 
 from sqlparse import tokens as T
 from sqlparse.compat import string_types, text_type, unicode_compatible
@@ -127,6 +130,20 @@ class Token(object):
             parent = parent.parent
         return False
 
+    def get_position(self):
+        """Returns the :class:`Position` where this token starts.
+
+        ``None`` is returned if the token doesn't belong to a
+        :class:`Statement` or has no position, see
+        :meth:`Statement.get_position`.
+        """
+        root = self
+        while root.parent is not None:
+            root = root.parent
+        if isinstance(root, Statement):
+            return root.get_position(self)
+        return None
+
 
 @unicode_compatible
 class TokenList(Token):
@@ -388,8 +405,145 @@ class TokenList(Token):
                 return token.get_name()
 
 
+#: Where a token starts in the source: the offset in characters and the
+#: line and column, both counting from 1.
+Position = namedtuple('Position', 'offset line column')
+
+
+def _line_starts(text):
+    starts = array('I', [0])
+    idx = text.find(u'\n')
+    while idx >= 0:
+        starts.append(idx + 1)
+        idx = text.find(u'\n', idx + 1)
+    return starts
+
+
 class Statement(TokenList):
-    """Represents a SQL statement."""
+    """Represents a SQL statement.
+
+    ``offset``, ``line`` and ``column`` tell where the statement starts
+    in the input it was split from, see :class:`Position`. The offsets
+    of its tokens are recorded when the statement is split, so tokens
+    are looked up by their position in the source even if the statement
+    is changed afterwards, see :meth:`get_token_at_source_offset`.
+    """
+
+    offset = 0
+    line = 1
+    column = 1
+    _leaves = None  # the ungrouped tokens
+    _starts = None  # their offsets in the statement, then its length
+    _indexes = None  # the indexes of the ungrouped tokens by their ids
+    _lines = None  # the offsets where lines start in the statement
+
+    def _record_source(self, leaves):
+        """Record the offsets of *leaves*, the ungrouped tokens."""
+        starts = array('I')
+        pos = 0
+        for token in leaves:
+            starts.append(pos)
+            pos += len(token.value)
+        starts.append(pos)
+        self._leaves = list(leaves)
+        self._starts = starts
+        self._indexes = None
+
+    def _get_source(self):
+        if self._leaves is None:
+            self._record_source(list(self.flatten()))
+        return self._leaves, self._starts
+
+    def _leaf_index(self, token):
+        if self._indexes is None:
+            self._indexes = dict((id(leaf), idx) for idx, leaf
+                                 in enumerate(self._get_source()[0]))
+        return self._indexes.get(id(token))
+
+    def _get_lines(self):
+        if self._lines is None:
+            self._lines = _line_starts(self.value)
+        return self._lines
+
+    def _position(self, offset):
+        lines = self._get_lines()
+        n = bisect.bisect_right(lines, offset) - 1
+        column = self.column + offset if n == 0 else offset - lines[n] + 1
+        return Position(self.offset + offset, self.line + n, column)
+
+    def get_position(self, token=None):
+        """Returns the :class:`Position` where *token* starts.
+
+        Without *token*, the position of the statement is returned.
+        Tokens that weren't split from the source (e.g. whitespace added
+        by a filter) have no position, ``None`` is returned for them.
+        """
+        if token is None or token is self:
+            return self._position(0)
+        # Of the groups, only dollar-quoted strings are split as a whole.
+        while token.is_group() and not isinstance(token, DollarQuoted):
+            if not token.tokens:
+                return None
+            token = token.tokens[0]
+
+        # Tokens in dollar-quoted strings are found relative to them.
+        offset = 0
+        idx = self._leaf_index(token)
+        while idx is None:
+            parent = token.parent
+            if parent is None or parent is self:
+                return None
+            siblings = parent.tokens
+            offset += sum(len(sibling.value)
+                          for sibling in siblings[:siblings.index(token)])
+            token = parent
+            idx = self._leaf_index(token)
+        return self._position(self._starts[idx] + offset)
+
+    def __reduce_ex__(self, protocol):
+        # Copies have tokens of their own, with other ids.
+        rv = super(Statement, self).__reduce_ex__(protocol)
+        state = rv[2]
+        if isinstance(state, tuple) and '_indexes' in (state[0] or ()):
+            attrs = dict(state[0])
+            del attrs['_indexes']
+            rv = rv[:2] + ((attrs, state[1]),) + rv[3:]
+        return rv
+
+    def get_token_at_source_offset(self, offset):
+        """Returns the token that was on position *offset* of the source.
+
+        *offset* is relative to the start of the statement. Unlike
+        :meth:`get_token_at_offset`, the token is found by a binary search
+        of the offsets recorded when the statement was split, so changes
+        to the statement after that don't move the tokens. ``None`` is
+        returned if the token was removed from the statement since.
+        """
+        leaves, starts = self._get_source()
+        idx = bisect.bisect_right(starts, offset) - 1
+        if not 0 <= idx < len(leaves):
+            return None
+        token = child = leaves[idx]
+        while child is not self:
+            parent = child.parent
+            if parent is None or child not in parent.tokens:
+                return None
+            child = parent
+        if token.is_group():
+            return token.get_token_at_offset(offset - starts[idx])
+        return token
+
+    def get_token_at_position(self, line, column):
+        """Returns the token at *line* and *column* of the source."""
+        lines = self._get_lines()
+        n = line - self.line
+        if not 0 <= n < len(lines):
+            return None
+        offset = lines[n] + column - (self.column if n == 0 else 1)
+        end = lines[n + 1] if n + 1 < len(lines) else len(self.value)
+        if not lines[n] <= offset < end:
+            return None
+        return self.get_token_at_source_offset(offset)
 
     def get_type(self):
         """Returns the type of a statement.
@@ -607,3 +761,47 @@ class Begin(TokenList):
 
 class Operation(TokenList):
     """Grouping of operations"""
+
+
+class DollarQuoted(TokenList):
+    """A dollar-quoted string, e.g. a function body.
+
+    Its child tokens are created by calling *load* with the value when
+    they are first accessed. Until then it isn't a group and behaves
+    like a single ``String.Dollar`` token.
+    """
+
+    __slots__ = ('_tokens', '_load')
+
+    def __init__(self, value, load):
+        Token.__init__(self, T.String.Dollar, value)
+        self._tokens = None
+        self._load = load
+
+    @property
+    def tokens(self):
+        if self._tokens is None:
+            self._tokens = self._load(self.value)
+            self._load = None
+            for token in self._tokens:
+                token.parent = self
+        return self._tokens
+
+    @tokens.setter
+    def tokens(self, tokens):
+        self._tokens = tokens
+
+    def __reduce_ex__(self, protocol):
+        if self._tokens is None:
+            # Don't load the tokens just to pickle them.
+            return (DollarQuoted, (self.value, self._load),
+                    (None, {'parent': self.parent}))
+        return super(DollarQuoted, self).__reduce_ex__(protocol)
+
+    def flatten(self):
+        if self._tokens is None:
+            return Token.flatten(self)
+        return super(DollarQuoted, self).flatten()
+
+    def is_group(self):
+        return self._tokens is not None
@@ -13,22 +13,54 @@
 
 
 class _TokenType(tuple):
+    """A token type.
+
+    Every token type has a small integer ``id`` (its index in
+    ``_registry``) and knows the ids of itself and all of its ancestors,
+    so a subtype test is a single set lookup.
+    """
     parent = None
 
+    def __init__(self, *args):
+        self.id = len(_registry)
+        self._ancestry = frozenset([self.id])
+        _registry.append(self)
+
     def __contains__(self, item):
-        return item is not None and (self is item or item[:len(self)] == self)
+        try:
+            return item is not None and self.id in item._ancestry
+        except AttributeError:
+            # Plain tuples don't have the precomputed ancestry.
+            return item[:len(self)] == self
 
     def __getattr__(self, name):
+        if name.startswith('__'):
+            # Not a subtype, e.g. __deepcopy__ looked up by copy. Copies
+            # use __reduce__ then, like pickle.
+            raise AttributeError(name)
         new = _TokenType(self + (name,))
         setattr(self, name, new)
         new.parent = self
+        new._ancestry = self._ancestry | new._ancestry
         return new
 
+    def __reduce__(self):
+        # Unpickle to the one instance of this type, not a copy of it.
+        return _get_type, (tuple(self),)
+
     def __repr__(self):
         # self can be False only if its the `root` ie. Token itself
         return 'Token' + ('.' if self else '') + '.'.join(self)
 
 
+def _get_type(names):
+    ttype = Token
+    for name in names:
+        ttype = getattr(ttype, name)
+    return ttype
+
+
+_registry = []
 Token = _TokenType()
 
 # Special token types
@@ -73,3 +73,37 @@ def test_script():
     # Call with the --help option as a basic sanity check.
     cmd = "{0:s} -m sqlparse.cli --help".format(sys.executable)
     assert subprocess.call(cmd.split()) == 0
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7),
+                    reason='submodules are imported eagerly')
+def test_import_is_lazy():
+    code = ("import sys, sqlparse; sqlparse.split('select 1');"
+            "print(' '.join(sorted(set(sys.modules) & {"
+            "'argparse', 'sqlparse.cli', 'sqlparse.filters', "
+            "'sqlparse.formatter'})))")
+    out = subprocess.check_output([sys.executable, '-c', code])
+    assert out.strip() == b''
+
+
+def test_index(tmpdir, capsys):
+    path = tmpdir.join('dump.sql')
+    path.write('select 1;\n\n-- c\ninsert into t values (1);\n')
+    assert sqlparse.cli.main([str(path), '--index']) == 0
+    out, _ = capsys.readouterr()
+    assert [line.split('\t')[:5] for line in out.splitlines()] == [
+        ['0', '1', '0', '9', 'SELECT'], ['1', '3', '11', '30', 'INSERT']]
+    assert tmpdir.join('dump.sql.sqlidx').check()
+
+    assert sqlparse.cli.main([str(path), '--statement', '1', '-k',
+                              'upper']) == 0
+    out, _ = capsys.readouterr()
+    assert out == '-- c\nINSERT INTO t VALUES (1);'
+
+    sqlparse.cli.main([str(path), '--statement', '2'])
+    _, err = capsys.readouterr()
+    assert err.endswith('has no statement 2\n')
+
+    sqlparse.cli.main(['-', '--index'])
+    _, err = capsys.readouterr()
+    assert err == '[ERROR] Statement indexes need a FILE, not stdin\n'
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+import sqlparse
+from sqlparse import dialects, keywords, lexer, tokens as T
+from sqlparse.exceptions import SQLParseError
+
+
+@pytest.mark.parametrize('dialect, ttype', [
+    (None, T.Keyword),
+    ('generic', T.Keyword),
+    ('druid', T.Keyword),
+    ('postgresql', T.Name),
+    ('oracle', T.Name),
+])
+def test_dialect_keywords(dialect, ttype):
+    tokens = list(lexer.tokenize('granularity', dialect=dialect))
+    assert tokens == [(ttype, 'granularity')]
+
+
+def test_dialect_rules():
+    sql = 'select `a`'
+    assert list(lexer.tokenize(sql, dialect='mysql'))[-1] == (T.Name, '`a`')
+    assert list(lexer.tokenize(sql, dialect='oracle'))[-1] != (T.Name, '`a`')
+
+    sql = 'select $$a;$$; select 2'
+    assert sqlparse.split(sql, dialect='postgresql') == [
+        'select $$a;$$;', 'select 2']
+    assert sqlparse.split(sql, dialect='mysql') == [
+        'select $$a;', '$$;', 'select 2']
+    assert sqlparse.split(sql, lazy_bodies=True, dialect='mysql') == [
+        'select $$a;', '$$;', 'select 2']
+
+
+def test_dialect_format():
+    sql = 'select a from t granularity day'
+    assert sqlparse.format(sql, reindent=True, dialect='druid') == (
+        'select a\nfrom t\ngranularity day')
+    assert sqlparse.format(sql, reindent=True, dialect='mysql') == (
+        'select a\nfrom t granularity day')
+
+
+def test_register_dialect():
+    dialect = dialects.Dialect('test', keywords=[
+        keywords.KEYWORDS_COMMON, {'FROBNICATE': T.Keyword.DML}])
+    dialects.register(dialect)
+    try:
+        assert 'test' in dialects.names()
+        stmt, = sqlparse.parse('frobnicate foo', dialect='test')
+        assert stmt.get_type() == 'FROBNICATE'
+        stmt, = sqlparse.parse('frobnicate foo', dialect=dialect)
+        assert stmt.get_type() == 'FROBNICATE'
+        assert sqlparse.parse('frobnicate foo')[0].get_type() == 'UNKNOWN'
+    finally:
+        del dialects._DIALECTS['test']
+
+    with pytest.raises(SQLParseError):
+        sqlparse.parse('select 1', dialect='test')
+
+
+def test_dialect_is_compiled_once():
+    assert lexer._get_dispatch('druid') is lexer._get_dispatch('druid')
+    assert lexer._get_dispatch() is lexer._get_dispatch('generic')
+    assert lexer._get_dispatch('druid', True) is not \
+        lexer._get_dispatch('druid')
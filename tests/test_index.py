@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+import codecs
+import hashlib
+import os
+
+import pytest
+
+import sqlparse
+from sqlparse import index
+from sqlparse.compat import text_type
+
+SQL = (u"select 1;\n\n-- c\ninsert into t values ('a;\nö;');\n"
+       u"with x as (select 1) select * from x;\n"
+       u"create function f() returns int as $$\nbegin\n select 1;\nend;\n"
+       u"$$ language plpgsql; foo;\n")
+
+
+def test_build(tmpdir):
+    path = tmpdir.join('dump.sql')
+    path.write_binary(SQL.encode('utf-8'))
+    idx = index.build(str(path))
+    assert len(idx) == 5
+    assert [entry.line for entry in idx] == [1, 3, 6, 7, 11]
+    assert [entry.type for entry in idx] == [
+        'SELECT', 'INSERT', 'SELECT', 'CREATE', 'UNKNOWN']
+    data = SQL.encode('utf-8')
+    stmts = [stmt for stmt in sqlparse.split(SQL) if stmt]
+    for entry, stmt in zip(idx, stmts):
+        assert data[entry.offset:entry.offset + entry.length] == \
+            stmt.encode('utf-8')
+        assert entry.hash == hashlib.sha1(
+            stmt.encode('utf-8')).hexdigest()[:16]
+    assert idx[-1] == idx[4]
+    with pytest.raises(IndexError):
+        idx[5]
+
+
+def test_statement_positions(tmpdir):
+    path = tmpdir.join('dump.sql')
+    path.write_binary(codecs.BOM_UTF8 + SQL.encode('utf-8'))
+    idx = index.build(str(path))
+    assert [(entry.line, entry.column) for entry in idx] == [
+        (1, 1), (3, 1), (6, 1), (7, 1), (11, 22)]
+    lines = SQL.split(u'\n')
+    for n, entry in enumerate(idx):
+        stmt = idx.statement(n)
+        assert stmt.get_position() == (
+            entry.text_offset, entry.line, entry.column)
+        for token in stmt.flatten():
+            pos = token.get_position()
+            assert SQL[pos.offset:].startswith(token.value)
+            assert lines[pos.line - 1][pos.column - 1:].startswith(
+                token.value.split(u'\n')[0])
+
+
+def test_load_uses_saved_index(tmpdir, monkeypatch):
+    path = tmpdir.join('dump.sql')
+    path.write_binary(SQL.encode('utf-8'))
+    expected = list(index.build(str(path)))
+
+    def build(*args):
+        raise AssertionError('index built again')
+
+    monkeypatch.setattr(index, 'build', build)
+    assert list(index.load(str(path))) == expected
+    stmt = index.load_statement(str(path), 3)
+    assert stmt.get_type() == 'CREATE'
+    assert text_type(stmt).endswith(u'$$ language plpgsql;')
+
+
+def test_load_rebuilds_stale_index(tmpdir):
+    path = tmpdir.join('dump.sql')
+    path.write_binary(b'select 1;')
+    assert len(index.load(str(path))) == 1
+
+    # Same size, only the modification time changed.
+    path.write_binary(b'update a;')
+    mtime = os.stat(str(path)).st_mtime
+    os.utime(str(path), (mtime + 10, mtime + 10))
+    assert sqlparse.load_statement(str(path), 0).get_type() == 'UPDATE'
+
+    path.write_binary(b'select 1; select 2;')
+    assert [entry.offset for entry in index.load(str(path))] == [0, 10]
+
+    # A truncated index is ignored as well.
+    with open(str(path) + index.INDEX_SUFFIX, 'r+b') as f:
+        f.truncate(os.path.getsize(f.name) - 1)
+    assert text_type(sqlparse.load_statement(str(path), -1)) == 'select 2;'
+
+
+def test_load_statement_encoding(tmpdir):
+    path = tmpdir.join('dump.sql')
+    path.write_binary(SQL.encode('utf-16'))
+    stmt = sqlparse.load_statement(str(path), 1)
+    assert text_type(stmt) == u"-- c\ninsert into t values ('a;\nö;');"
+    assert index.load(str(path)).encoding == 'utf-16-le'
+    with pytest.raises(IndexError):
+        sqlparse.load_statement(str(path), 5)
+
+
+def test_load_statement_dialect(tmpdir):
+    path = tmpdir.join('dump.sql')
+    path.write_binary(b'select `a;b` from t; select 2;')
+    assert len(index.load(str(path))) == 2
+    # No quoted names in backticks, the index is built again.
+    idx = index.load(str(path), dialect='postgresql')
+    assert len(idx) == 3
+    assert text_type(idx.statement(1)) == 'b` from t;'
+    assert text_type(index.load_statement(str(path), 1)) == 'select 2;'
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from sqlparse import keywords, tokens as T
+
+
+@pytest.fixture()
+def keyword_cache():
+    yield keywords
+    keywords.set_cache_size(10000)
+
+
+@pytest.mark.parametrize('word, ttype', [
+    ('select', T.Keyword.DML),
+    ('SELECT', T.Keyword.DML),
+    ('resetlogs', T.Keyword),
+    ('granularity', T.Keyword),
+    ('foo', T.Name),
+])
+def test_is_keyword(word, ttype):
+    assert keywords.is_keyword(word) == (ttype, word)
+
+
+def test_is_keyword_precedence():
+    # KEYWORDS_COMMON and KEYWORDS_ORACLE win over KEYWORDS
+    for table in (keywords.KEYWORDS_ORACLE, keywords.KEYWORDS_COMMON):
+        for word, ttype in table.items():
+            if table is keywords.KEYWORDS_ORACLE \
+                    and word in keywords.KEYWORDS_COMMON:
+                continue
+            assert keywords.is_keyword(word.lower())[0] is ttype
+
+
+def test_keyword_cache(keyword_cache):
+    keyword_cache.set_cache_size(2)
+    keyword_cache.is_keyword('select')
+    keyword_cache.is_keyword('select')
+    keyword_cache.is_keyword('Select')
+    assert keyword_cache.cache_info() == (1, 2, 2, 2)
+    keyword_cache.is_keyword('foo')
+    assert keyword_cache.cache_info().currsize == 1
+    assert keyword_cache.is_keyword('foo') == (T.Name, 'foo')
+
+    keyword_cache.set_cache_size(0)
+    assert keyword_cache.is_keyword('select') == (T.Keyword.DML, 'select')
+    assert keyword_cache.cache_info() == (0, 1, 0, 0)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+import codecs
+
+import pytest
+
+import sqlparse
+from sqlparse import parallel
+from sqlparse.compat import text_type
+
+SQL = (u"select 1;\ninsert into t values ('a;\nb;\n');\n"
+       u"create function f() returns int as $$\nbegin\n select 1;\nend;\n"
+       u"$$ language plpgsql;\n/* comment;\n select 2;\n */ select 3;\n"
+       u"-- c;\nupdate t set a = 'ö';\n") * 5
+
+
+def get_type(stmt):
+    return stmt.get_type()
+
+
+def get_positions(stmt):
+    return [stmt.get_position()] + [token.get_position()
+                                    for token in stmt.flatten()]
+
+
+@pytest.mark.parametrize('range_size', [1, 30, 1000])
+def test_parallel_ranges(tmpdir, range_size):
+    path = tmpdir.join('dump.sql')
+    path.write_binary(codecs.BOM_UTF8 + SQL.encode('utf-8'))
+    data = path.read_binary()
+    ranges = list(parallel._ranges(str(path), 3, len(data), 'utf-8',
+                                   range_size))
+    assert ranges[0][0] == 3 and ranges[-1][1] == len(data)
+    for (start, stop, _), (next_start, _, _) in zip(ranges, ranges[1:]):
+        assert stop == next_start and stop - start >= range_size
+        assert data[stop - 1:stop] == b'\n'
+    for start, _, position in ranges:
+        text = data[3:start].decode('utf-8')
+        assert position == (len(text), text.count(u'\n') + 1, 1)
+
+
+@pytest.mark.parametrize('processes', [1, 2, 7])
+@pytest.mark.parametrize('bom', [b'', codecs.BOM_UTF8])
+def test_parallel_parse(tmpdir, processes, bom):
+    path = tmpdir.join('dump.sql')
+    path.write_binary(bom + SQL.encode('utf-8'))
+    stmts = parallel.parse(str(path), text_type, processes)
+    assert list(stmts) == [text_type(stmt) for stmt in sqlparse.parse(SQL)]
+
+
+@pytest.mark.parametrize('processes', [2, 7])
+@pytest.mark.parametrize('bom', [b'', codecs.BOM_UTF8])
+def test_parallel_parse_positions(tmpdir, processes, bom):
+    # Cuts inside the bodies make the calling process parse again from
+    # the middle of a line.
+    sql = (SQL + u'create function f() returns int as $$\n'
+           + u'select 1;\n' * 200 + u'$$ language sql; select 2;\n') * 2
+    path = tmpdir.join('dump.sql')
+    path.write_binary(bom + sql.encode('utf-8'))
+    positions = parallel.parse(str(path), get_positions, processes)
+    assert list(positions) == [get_positions(stmt)
+                               for stmt in sqlparse.parse(sql)]
+
+
+def test_parallel_parse_cut_in_body(tmpdir):
+    # Most cuts are inside the function bodies.
+    sql = (u'create function f() returns int as $$\n'
+           + u'select 1;\n' * 500
+           + u'$$ language sql;\nselect 2;\n') * 3
+    path = tmpdir.join('dump.sql')
+    path.write_binary(sql.encode('utf-8'))
+    stmts = list(parallel.parse(str(path), get_type, 4))
+    assert stmts == ['CREATE', 'SELECT'] * 3 + ['UNKNOWN']
+
+
+def test_parallel_parse_statements(tmpdir):
+    path = tmpdir.join('dump.sql')
+    path.write_binary(SQL.encode('utf-8'))
+    stmts = list(parallel.parse(str(path), processes=2, lazy_bodies=True,
+                                dialect='postgresql'))
+    assert stmts[0].get_type() == 'SELECT'
+    assert u''.join(map(text_type, stmts)) == SQL
+    body, = [token for token in stmts[2].flatten()
+             if isinstance(token, sqlparse.sql.DollarQuoted)]
+    assert isinstance(body.tokens[2], sqlparse.sql.Begin)
+
+
+def test_parallel_parse_utf16(tmpdir):
+    # Newlines aren't single bytes, so there's only one process.
+    path = tmpdir.join('dump.sql')
+    path.write_binary(SQL.encode('utf-16'))
+    stmts = parallel.parse(str(path), text_type, processes=2)
+    assert u''.join(stmts) == SQL
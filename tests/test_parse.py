@@ -2,11 +2,14 @@
 
 """Tests sqlparse.parse()."""
 
+import copy
+import pickle
+
 import pytest
 
 import sqlparse
-from sqlparse import sql, tokens as T
-from sqlparse.compat import StringIO
+from sqlparse import engine, filters, sql, tokens as T
+from sqlparse.compat import StringIO, text_type
 
 
 def test_parse_tokenize():
@@ -166,6 +169,26 @@ def test_psql_quotation_marks():
     assert len(t) == 2
 
 
+def test_psql_lazy_bodies():
+    s = ("CREATE FUNCTION f() RETURNS integer AS $body$\n"
+         "BEGIN SELECT 'x;' || $$y$$; END;\n"
+         "$body$ LANGUAGE plpgsql;")
+    stmt = sqlparse.parse(s, lazy_bodies=True)[0]
+    body = stmt.tokens[8].tokens[-1]
+    assert isinstance(body, sql.DollarQuoted)
+    assert body.ttype is T.String.Dollar
+    assert not body.is_group()
+    assert body.value == s[39:-18]
+    assert str(stmt) == s
+
+    # Tokenized and grouped on first access
+    assert body.tokens[0].match(T.Name.Builtin, '$body$')
+    assert isinstance(body.tokens[2], sql.Begin)
+    assert body.is_group()
+    assert body.tokens[2].has_ancestor(stmt)
+    assert str(stmt) == s
+
+
 def test_double_precision_is_builtin():
     s = 'DOUBLE PRECISION'
     t = sqlparse.parse(s)[0].tokens
@@ -303,6 +326,82 @@ def test_get_token_at_offset():
     assert p.get_token_at_offset(10) == p.tokens[4]
 
 
+POSITION_SQL = (u"select 1;\n  select a,\n   b from t; -- c\n"
+                u"insert into t values ('x\ny', 2);")
+
+
+def _check_positions(stmts, text):
+    for stmt in stmts:
+        pos = stmt.get_position()
+        assert text[pos.offset:].startswith(text_type(stmt))
+        for token in stmt.flatten():
+            pos = token.get_position()
+            assert text[pos.offset:].startswith(token.value)
+            lines = text.split(u'\n')
+            assert lines[pos.line - 1][pos.column - 1:] \
+                == text[pos.offset:].split(u'\n')[0]
+            if token.value:
+                assert stmt.get_token_at_source_offset(
+                    pos.offset - stmt.offset) is token
+                assert stmt.get_token_at_position(pos.line, pos.column) \
+                    is token
+
+
+def test_statement_position():
+    stmts = sqlparse.parse(POSITION_SQL)
+    assert [stmt.get_position() for stmt in stmts] == [
+        (0, 1, 1), (9, 1, 10), (40, 4, 1)]
+    assert stmts[1].line == 1 and stmts[1].column == 10
+    idents = stmts[1].token_next_by(i=sql.IdentifierList)[1]
+    assert idents.get_position() == (19, 2, 10)
+    assert list(idents.get_identifiers())[1].get_position() == (25, 3, 4)
+    assert stmts[2].tokens[-1].get_position() == (71, 5, 7)
+    _check_positions(stmts, POSITION_SQL)
+
+
+def test_statement_position_stream():
+    text = POSITION_SQL * 200
+    stmts = list(sqlparse.parsestream(StringIO(text)))
+    assert stmts[-1].get_position() == (len(text) - 32, 800, 1)
+    _check_positions(stmts, text)
+
+
+def test_statement_position_dollar_quoted():
+    text = u'select 1;\ncreate function f() as $$\nselect 2;\n$$;\n'
+    stmts = sqlparse.parse(text, lazy_bodies=True)
+    body, = [token for token in stmts[1].flatten()
+             if isinstance(token, sql.DollarQuoted)]
+    assert body.get_position() == (33, 2, 24)
+    assert stmts[1].get_token_at_position(3, 8) is body
+    # Once loaded, the tokens of the body are found too.
+    assert body.tokens[2].get_position() == (36, 3, 1)
+    assert stmts[1].get_token_at_position(3, 8) is body.tokens[4]
+    _check_positions(stmts, text)
+
+
+def test_statement_position_changed():
+    stmt = sqlparse.parse(u'select  a\nfrom t')[0]
+    stmt.tokens[0].value = u'SELECT'
+    del stmt.tokens[1:2]
+    stmt.insert_after(stmt.tokens[0], sql.Token(T.Whitespace, u' '))
+    # Offsets are in the changed statement, positions are still where
+    # the tokens were split from.
+    assert stmt.get_token_at_offset(7) is stmt.tokens[2].tokens[0]
+    assert stmt.get_token_at_offset(8) is stmt.tokens[3]
+    assert stmt.get_token_at_source_offset(8) is stmt.tokens[2].tokens[0]
+    assert stmt.get_token_at_source_offset(7) is None
+    assert stmt.tokens[2].get_position() == (8, 1, 9)
+    assert stmt.tokens[1].get_position() is None
+    assert sql.Token(T.Whitespace, u' ').get_position() is None
+
+
+def test_statement_position_copy():
+    stmt = sqlparse.parse(POSITION_SQL)[2]
+    for new in (copy.deepcopy(stmt), pickle.loads(pickle.dumps(stmt, 2))):
+        assert new.get_position() == stmt.get_position()
+        assert new.tokens[-1].get_position() == (71, 5, 7)
+
+
 def test_pprint():
     p = sqlparse.parse('select a0, b0, c0, d0, e0 from '
                        '(select * from dual) q0 where 1=1 and 2=2')[0]
@@ -384,3 +483,84 @@ def test_stmt_tokens_parents():
     stmt = sqlparse.parse(s)[0]
     for token in stmt.tokens:
         assert token.has_ancestor(stmt)
+
+
+DEDUP_SQL = (u"select a from t where b = 1;\ninsert into t values ($$x$$);\n"
+             u"select a from t where b = 1;\nselect a from t where b = 1;\n"
+             u"insert into t values ($$x$$);\n")
+
+
+def _tree(token):
+    children = [_tree(child) for child in token.tokens] \
+        if token.is_group() else None
+    return type(token), token.ttype, token.value, children
+
+
+def test_parse_dedup():
+    stmts = sqlparse.parse(DEDUP_SQL, dedup=True)
+    # The first statement doesn't start with a newline.
+    assert stmts[0] is not stmts[2]
+    assert stmts[2] is stmts[3]
+    assert stmts[1] is stmts[4]
+    assert [_tree(stmt) for stmt in stmts] == [
+        _tree(stmt) for stmt in sqlparse.parse(DEDUP_SQL)]
+
+    cache = engine.StatementCache()
+    list(sqlparse.parsestream(StringIO(DEDUP_SQL), dedup=cache))
+    assert sqlparse.parse(DEDUP_SQL, dedup=cache)[0] is \
+        sqlparse.parse(DEDUP_SQL, dedup=cache)[0]
+    assert cache.cache_info() == (14, 4, 1000, 4)
+    cache.clear()
+    assert cache.cache_info() == (0, 0, 1000, 0)
+
+
+@pytest.mark.parametrize('lazy_bodies', [False, True])
+def test_parse_dedup_copy(lazy_bodies):
+    cache = engine.StatementCache(copy=True)
+    stmts = sqlparse.parse(DEDUP_SQL, lazy_bodies=lazy_bodies, dedup=cache)
+    assert len(set(map(id, stmts))) == 6
+    expected = sqlparse.parse(DEDUP_SQL, lazy_bodies=lazy_bodies)
+    assert [_tree(stmt) for stmt in stmts] \
+        == [_tree(stmt) for stmt in expected]
+    assert [stmt.get_position() for stmt in stmts] \
+        == [stmt.get_position() for stmt in expected]
+    for stmt in stmts:
+        for token in stmt.flatten():
+            assert token.has_ancestor(stmt)
+    # Changing a copy doesn't change the others.
+    stmts[2].tokens[0].value = u'SELECT'
+    assert text_type(stmts[3]) == u'\nselect a from t where b = 1;'
+    assert cache.cache_info().hits == 2
+
+
+def test_parse_dedup_filters():
+    def run(dedup):
+        stack = engine.FilterStack()
+        stack.enable_grouping()
+        if dedup:
+            stack.enable_dedup()
+        stack.stmtprocess.append(filters.KeywordCaseFilter('upper'))
+        stack.postprocess.append(filters.SerializerUnicode())
+        return list(stack.run(DEDUP_SQL))
+    assert run(True) == run(False)
+
+
+def test_parse_dedup_maxsize():
+    cache = engine.StatementCache(maxsize=2)
+    stmts = sqlparse.parse(DEDUP_SQL, dedup=cache)
+    assert stmts[1] is stmts[4]
+    assert stmts[2] is stmts[3]
+    assert cache.cache_info() == (2, 4, 2, 2)
+    # The insert was used last, the second select was evicted instead.
+    insert = text_type(stmts[1])
+    assert sqlparse.parse(insert, dedup=cache)[0] is stmts[1]
+    select = text_type(stmts[2])
+    assert sqlparse.parse(select, dedup=cache)[0] is not stmts[2]
+
+    cache = engine.StatementCache(maxsize=None)
+    sqlparse.parse(DEDUP_SQL * 3, dedup=cache)
+    assert cache.cache_info() == (12, 4, None, 4)
+    cache = engine.StatementCache(maxsize=0)
+    stmts = sqlparse.parse(DEDUP_SQL, dedup=cache)
+    assert stmts[2] is not stmts[3]
+    assert cache.cache_info() == (0, 6, 0, 0)
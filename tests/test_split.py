@@ -2,11 +2,14 @@
 
 # Tests splitting functions.
 
+import codecs
+import io
 import types
 
 import pytest
 
 import sqlparse
+from sqlparse import engine, lexer, tokens as T
 from sqlparse.compat import StringIO, text_type
 
 
@@ -35,6 +38,14 @@ def test_split_create_function(load_file, fn):
     assert text_type(stmts[0]) == sql
 
 
+@pytest.mark.parametrize('fn', ['function_psql.sql',
+                                'function_psql2.sql',
+                                'function_psql3.sql'])
+def test_split_lazy_bodies(load_file, fn):
+    sql = load_file(fn)
+    assert sqlparse.split(sql, lazy_bodies=True) == sqlparse.split(sql)
+
+
 def test_split_dashcomments(load_file):
     sql = load_file('dashcomment.sql')
     stmts = sqlparse.parse(sql)
@@ -133,8 +144,188 @@ def test_split_unicode_parsestream():
     assert str(stmts[0]) == 'SELECT ö'
 
 
+@pytest.mark.parametrize('data, encoding', [
+    (u"SELECT 'ö'; SELECT 2;".encode('utf-8'), None),
+    (bytearray(u"SELECT 'ö'; SELECT 2;".encode('cp1252')), 'cp1252'),
+    (memoryview(u"SELECT 'ö'; SELECT 2;".encode('utf-16')), None),
+])
+def test_split_bytes(data, encoding):
+    stmts = sqlparse.split(data, encoding)
+    assert stmts == [u"SELECT 'ö';", u'SELECT 2;']
+
+
 def test_split_simple():
     stmts = sqlparse.split('select * from foo; select * from bar;')
     assert len(stmts) == 2
     assert stmts[0] == 'select * from foo;'
     assert stmts[1] == 'select * from bar;'
+
+
+def test_split_stream_is_incremental():
+    sql = u'select 1;\n' + u'select 2;\n' * 20000
+    stream = StringIO(sql)
+    stmts = sqlparse.parsestream(stream)
+    assert text_type(next(stmts)).strip() == 'select 1;'
+    assert stream.tell() < len(sql)
+
+
+def test_split_path(tmpdir):
+    pathlib = pytest.importorskip('pathlib')
+    path = tmpdir.join('dump.sql')
+    path.write_binary(u"select 'ö'; select 2;".encode('utf-8'))
+    stmts = sqlparse.split(pathlib.Path(str(path)))
+    assert stmts == [u"select 'ö';", u'select 2;']
+
+    path.write_binary(u"select 'й';".encode('cp1251'))
+    stmts = list(sqlparse.parsestream(pathlib.Path(str(path)), 'cp1251'))
+    assert text_type(stmts[0]) == u"select 'й';"
+
+
+def test_split_path_empty(tmpdir):
+    pathlib = pytest.importorskip('pathlib')
+    path = tmpdir.join('empty.sql')
+    path.write_binary(b'')
+    assert sqlparse.split(pathlib.Path(str(path))) == []
+
+
+@pytest.mark.parametrize('fn', ['function.sql', 'function_psql.sql',
+                                'function_psql2.sql', 'begintag.sql',
+                                'begintag_2.sql', 'dashcomment.sql'])
+@pytest.mark.parametrize('lazy_bodies', [False, True])
+def test_split_offsets(load_file, fn, lazy_bodies):
+    sql = load_file(fn)
+    stack = sqlparse.engine.FilterStack()
+    if lazy_bodies:
+        stack.enable_lazy_bodies()
+    expected = [text_type(stmt) for stmt in stack.run(sql)]
+    offsets = sqlparse.split_offsets(sql, lazy_bodies=lazy_bodies)
+    assert [sql[start:end] for start, end in offsets] == expected
+
+
+@pytest.mark.parametrize('sql, expected', [
+    ('', []),
+    ('  ', [(0, 2)]),
+    ('select 1;  -- c\n select 2', [(0, 17), (17, 25)]),
+    ('select 1;;', [(0, 9), (9, 10)]),
+    (b'select 1; select 2', [(0, 10), (10, 18)]),
+])
+def test_split_offsets_edges(sql, expected):
+    assert sqlparse.split_offsets(sql) == expected
+
+
+@pytest.mark.parametrize('encoding, bom', [
+    (None, b''),
+    (None, codecs.BOM_UTF8),
+    ('utf-16-le', b''),
+    (None, codecs.BOM_UTF16_LE),
+])
+def test_splitstream_offsets(encoding, bom):
+    sql = u"  select 'ö';\n-- x\nselect 2; /* c */ select $$a;b$$;\n\n"
+    codec = encoding or {codecs.BOM_UTF16_LE: 'utf-16-le'}.get(bom, 'utf-8')
+    data = bom + sql.encode(codec)
+    stmts = list(sqlparse.splitstream(io.BytesIO(data), encoding))
+    assert [stmt for _, stmt in stmts] == [
+        stmt for stmt in sqlparse.split(sql) if stmt]
+    for offset, stmt in stmts:
+        assert data[offset:].startswith(stmt.encode(codec))
+
+
+def test_splitstream_text():
+    sql = u"select 'ö';\n\nselect 2;  \n  "
+    stmts = list(sqlparse.splitstream(StringIO(sql)))
+    assert stmts == [(0, u"select 'ö';"), (13, u'select 2;')]
+
+
+def test_splitstream_is_incremental():
+    sql = b'select 1;\n' + b'select 2;\n' * 20000
+    stream = io.BytesIO(sql)
+    stmts = sqlparse.splitstream(stream)
+    assert next(stmts) == (0, u'select 1;')
+    assert stream.tell() < len(sql)
+    assert sum(1 for _ in stmts) == 20000
+
+
+def test_splitstream_path(tmpdir):
+    pathlib = pytest.importorskip('pathlib')
+    path = tmpdir.join('dump.sql')
+    path.write_binary(u"select 'й'; select 2;".encode('cp1251'))
+    stmts = sqlparse.splitstream(pathlib.Path(str(path)), 'cp1251')
+    assert list(stmts) == [(0, u"select 'й';"), (12, u'select 2;')]
+
+
+PG_DUMP = (u"SET x = 1;\nCOPY public.t (a, b) FROM stdin;\n"
+           u"1\tfoo; select 'x\n2\t\\N\n\\.\n"
+           u"COPY t2 FROM stdin;\n\\.\ncopy t3 to stdout;\nselect 2;\n")
+
+MYSQLDUMP = (u"DROP TRIGGER IF EXISTS t;\nDELIMITER ;;\n"
+             u"/*!50003 CREATE TRIGGER t BEFORE INSERT ON x FOR EACH ROW "
+             u"BEGIN\n  SET NEW.a = 1;\nEND */;;\nDELIMITER ;\n"
+             u"delimiter //\nCREATE PROCEDURE p() BEGIN select 1; END//\n"
+             u"delimiter ;\nselect 3;\n")
+
+
+def _split_dump(sql, modes):
+    lex = lexer.Lexer(dump_modes=modes)
+    stmts = [sql[start:end].strip()
+             for start, end in engine.split_offsets(sql, lex)]
+    assert [stmt for _, stmt in engine.splitstream(StringIO(sql), lex)] \
+        == [stmt for stmt in stmts if stmt]
+    assert [text_type(stmt).strip() for stmt in
+            engine.FilterStack(lexer=lex).run(sql)] == stmts
+    return stmts
+
+
+def test_split_string_ending_in_backslash():
+    sql = "select 'C:\\'; select 1; select 2;"
+    assert sqlparse.split(sql) == ["select 'C:\\';", 'select 1;',
+                                   'select 2;']
+    assert len(sqlparse.parse(sql)) == 3
+
+
+def test_split_command_keyword():
+    # Only DELIMITER commands of the dump mode change the delimiter.
+    sql = u'foo; select 1;'
+    lex = lexer.Lexer(keywords={'FOO': T.Keyword.Command})
+    stack = engine.FilterStack(lexer=lex)
+    assert [text_type(stmt) for stmt in stack.run(sql)] == [
+        u'foo; ', u'select 1;']
+    assert engine.split_offsets(sql, lex) == [(0, 5), (5, 14)]
+    stream = io.BytesIO(sql.encode('utf-8'))
+    assert list(engine.splitstream(stream, lex)) == [
+        (0, u'foo;'), (5, u'select 1;')]
+
+
+def test_split_dump_copy():
+    assert _split_dump(PG_DUMP, ['copy']) == [
+        u'SET x = 1;',
+        u"COPY public.t (a, b) FROM stdin;\n1\tfoo; select 'x\n2\t\\N\n\\.",
+        u'COPY t2 FROM stdin;\n\\.', u'copy t3 to stdout;', u'select 2;', u'']
+    # Without the dump mode, the quote in the rows swallows the rest.
+    assert sqlparse.split(PG_DUMP)[2:] == [
+        u'1\tfoo;', PG_DUMP[PG_DUMP.index(u'select'):].strip()]
+
+
+def test_split_dump_copy_stream():
+    # The rows span several chunks and the closing line is missing.
+    rows = u''.join(u"{0}\t'{0};\n".format(i) for i in range(50000))
+    sql = u'select 1;\ncopy t from stdin;\n' + rows
+    lex = lexer.Lexer(dump_modes=['copy'])
+    stmts = list(engine.splitstream(io.BytesIO(sql.encode('utf-8')), lex))
+    assert stmts == [(0, u'select 1;'), (10, sql[10:].rstrip())]
+    assert list(lex.get_tokens(sql))[-1] == (T.Other, u'\n' + rows)
+
+
+def test_split_dump_delimiter():
+    stmts = _split_dump(MYSQLDUMP, ['delimiter', 'copy'])
+    assert stmts == [
+        u'DROP TRIGGER IF EXISTS t;', u'DELIMITER ;;',
+        u'/*!50003 CREATE TRIGGER t BEFORE INSERT ON x FOR EACH ROW '
+        u'BEGIN\n  SET NEW.a = 1;\nEND */;;',
+        u'DELIMITER ;', u'delimiter //',
+        u'CREATE PROCEDURE p() BEGIN select 1; END//', u'delimiter ;',
+        u'select 3;', u'']
+    stack = engine.FilterStack(
+        lexer=lexer.Lexer('mysql', dump_modes=['delimiter']))
+    stack.enable_grouping()
+    assert [stmt.get_type() for stmt in stack.run(MYSQLDUMP)][:6] == [
+        'DROP', 'UNKNOWN', 'UNKNOWN', 'UNKNOWN', 'UNKNOWN', 'CREATE']
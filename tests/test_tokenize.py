@@ -1,5 +1,11 @@
 # -*- coding: utf-8 -*-
 
+import codecs
+import copy
+import io
+import pickle
+import re
+import timeit
 import types
 
 import pytest
@@ -8,6 +14,8 @@ import sqlparse
 from sqlparse import lexer
 from sqlparse import sql, tokens as T
 from sqlparse.compat import StringIO
+from sqlparse.exceptions import SQLParseError
+from sqlparse.keywords import FLAGS, SQL_REGEX
 
 
 def test_tokenize_simple():
@@ -67,6 +75,34 @@ def test_tokenize_negative_numbers():
     assert tokens[2][1] == '-1'
 
 
+def test_tokentype_contains():
+    assert T.Keyword.DML in T.Keyword
+    assert T.Keyword in T.Keyword
+    assert T.Keyword in T.Token
+    assert T.Keyword not in T.Keyword.DML
+    assert T.Name.Builtin not in T.Keyword
+    assert None not in T.Keyword
+    assert ('Keyword', 'DML') in T.Keyword
+
+
+def test_tokentype_ids():
+    ids = [ttype.id for ttype in (T.Token, T.Keyword, T.Keyword.DML)]
+    assert len(set(ids)) == 3
+    assert T.Token.id == 0
+
+
+def test_tokentype_pickle():
+    assert pickle.loads(pickle.dumps(T.Keyword.DML)) is T.Keyword.DML
+
+
+def test_tokentype_copy():
+    stmt = sqlparse.parse('select 1')[0]
+    assert copy.deepcopy(T.Keyword.DML) is T.Keyword.DML
+    assert copy.deepcopy(stmt).tokens[0].ttype is T.Keyword.DML
+    with pytest.raises(AttributeError):
+        T.Keyword.__foo__
+
+
 def test_token_str():
     token = sql.Token(None, 'FoO')
     assert str(token) == 'FoO'
@@ -157,3 +193,361 @@ def test_parse_endifloop(s):
     p = sqlparse.parse(s)[0]
     assert len(p.tokens) == 1
     assert p.tokens[0].ttype is T.Keyword
+
+
+def _tokenize_rule_by_rule(text):
+    # Reference lexer: try every rule of the table in turn at each position.
+    rules = [(re.compile(rx, FLAGS).match, tt) for rx, tt in SQL_REGEX]
+    pos, error = 0, ''
+    while pos < len(text):
+        for rexmatch, action in rules:
+            m = rexmatch(text, pos)
+            if m:
+                if error:
+                    yield T.Error, error
+                    error = ''
+                if isinstance(action, T._TokenType):
+                    yield action, m.group()
+                else:
+                    yield action(m.group())
+                pos = m.end()
+                break
+        else:
+            error += text[pos]
+            pos += 1
+    if error:
+        yield T.Error, error
+
+
+@pytest.mark.parametrize('fn', ['function.sql',
+                                'function_psql.sql',
+                                'function_psql2.sql',
+                                'function_psql3.sql',
+                                'huge_select.sql',
+                                '_Make_DirEntry.sql',
+                                'begintag.sql',
+                                'dashcomment.sql'])
+def test_tokenize_single_scanner_matches_rule_table(load_file, fn):
+    sql = load_file(fn)
+    assert list(lexer.tokenize(sql)) == list(_tokenize_rule_by_rule(sql))
+
+
+@pytest.mark.parametrize('s', [
+    "select a.b, `c`, [d], \"e\" from f::g where x :=-1.5E-3",
+    "foo . bar(baz) left outer join qux end if; $body$ ?, %(x)s, :y",
+    "¿ FOOBAR{ ´a´´b´ #tmp ## @var",
+])
+def test_tokenize_single_scanner_priorities(s):
+    assert list(lexer.tokenize(s)) == list(_tokenize_rule_by_rule(s))
+
+
+@pytest.mark.parametrize('tail', ['', 'x', '1', 'abc', ' .y', '(', '*/'])
+def test_tokenize_first_char_dispatch(tail):
+    for s in [chr(i) + tail for i in range(128)] + [u'Kſtail']:
+        if s[0] in '\'"`' or s.startswith('/*'):
+            continue  # unterminated literals, see below
+        assert list(lexer.tokenize(s)) == list(_tokenize_rule_by_rule(s))
+
+
+def test_tokenize_dispatch_is_compiled_lazily():
+    dispatch = lexer._Dispatch(SQL_REGEX)
+    assert len(dispatch) == 0
+    assert dispatch['a'] is dispatch['b']
+    assert dispatch[u'ö'] is dispatch[u'ü']
+    assert sorted(dispatch) == sorted(['a', 'b', u'ö', u'ü'])
+
+
+class _TrickleStream(object):
+    # Returns at most n characters per read() like a slow pipe would.
+    def __init__(self, data, n):
+        self._stream = io.BytesIO(data) if isinstance(data, bytes) \
+            else io.StringIO(data)
+        self._n = n
+
+    def read(self, size=-1):
+        return self._stream.read(min(size, self._n))
+
+
+@pytest.mark.parametrize('n', [3, 1000, 70000])
+def test_stream_chunk_boundaries(n):
+    s = (u"select 'ab''c\\'d" + u'x' * 3000 + u"' from t; /* "
+         + u'c' * 2000 + u" */ select a" + u' ' * 2000 + u". b, `q"
+         + u'`' * 2 + u"`, [x" + u'y' * 1500 + u"] left" + u' ' * 50
+         + u'outer join "sym\\"bol" -- ö\r\n'
+         + u'{}\x00' * 1000 + u' '
+         + u"'unterminated" * 200)
+    expected = list(lexer.tokenize(s))
+    assert list(lexer.tokenize(_TrickleStream(s, n))) == expected
+    data = s.encode('utf-8')
+    assert list(lexer.tokenize(_TrickleStream(data, n))) == expected
+
+
+@pytest.mark.parametrize('words', ['LEFT OUTER JOIN', 'NOT NULL',
+                                   'CREATE OR REPLACE', 'a .'])
+def test_stream_words_across_chunks(monkeypatch, words):
+    # Keywords made of several words can be split by a lot of whitespace.
+    s = u'select * from t ' + u' '.join(
+        word + u' ' * 3000 for word in words.split()) + u'b'
+    expected = list(lexer.tokenize(s))
+    for size in range(2990, 3050, 3):
+        monkeypatch.setattr(lexer, 'CHUNK_SIZE', size)
+        assert list(lexer.tokenize(StringIO(s))) == expected
+
+
+@pytest.mark.parametrize('bom, encoding', [
+    (b'', 'utf-8'),
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+])
+def test_stream_byte_order_mark(bom, encoding):
+    s = u"select 'й' from t;" * 1000
+    data = bom + s.encode(encoding)
+    expected = list(lexer.tokenize(s))
+    assert list(lexer.tokenize(data)) == expected
+    assert list(lexer.tokenize(_TrickleStream(data, 3))) == expected
+    assert list(lexer.tokenize_columnar(data)) == expected
+
+
+def test_tokenize_bytes():
+    s = u"select 'й' from t;"
+    expected = list(lexer.tokenize(s))
+    for data in (s.encode('utf-8'), bytearray(s.encode('utf-8')),
+                 memoryview(s.encode('utf-8'))):
+        assert list(lexer.tokenize(data)) == expected
+        assert list(lexer.tokenize_columnar(data)) == expected
+    for wrap in (bytes, bytearray, memoryview):
+        data = wrap(s.encode('cp1251'))
+        assert list(lexer.tokenize(data, 'cp1251')) == expected
+    assert list(lexer.tokenize(memoryview(b'select 1;'))) == [
+        (T.Keyword.DML, 'select'), (T.Whitespace, ' '),
+        (T.Number.Integer, '1'), (T.Punctuation, ';')]
+
+
+def test_tokenize_error_run():
+    s = u'select \x00\x01{}{ from t; {'
+    expected = [(T.Keyword.DML, 'select'), (T.Whitespace, ' '),
+                (T.Error, u'\x00\x01{}{'), (T.Whitespace, ' '),
+                (T.Keyword, 'from'), (T.Whitespace, ' '), (T.Name, 't'),
+                (T.Punctuation, ';'), (T.Whitespace, ' '), (T.Error, '{')]
+    assert list(lexer.tokenize(s)) == expected
+    assert list(lexer.tokenize_columnar(s)) == expected
+
+
+@pytest.mark.parametrize('s', [u'`\x00"', u"x \x00{'abc", u"{'a\n"])
+def test_tokenize_error_run_unterminated(s):
+    # The run and the unterminated literal are a single token, like when
+    # streamed.
+    expected = list(lexer.tokenize(StringIO(s)))
+    assert list(lexer.tokenize(s)) == expected
+    assert list(lexer.tokenize_columnar(s)) == expected
+    assert [ttype for ttype, _ in expected].count(T.Error) == 1
+
+
+@pytest.mark.parametrize('s, expected', [
+    ('$a$ x; $$ $A$ $a$;', [(T.String.Dollar, '$a$ x; $$ $A$ $a$'),
+                            (T.Punctuation, ';')]),
+    ('$$$$ $1', [(T.String.Dollar, '$$$$'), (T.Whitespace, ' '),
+                 (T.Name.Placeholder, '$1')]),
+    ('x $a$ y', [(T.Name, 'x'), (T.Whitespace, ' '), (T.Error, '$a$ y')]),
+])
+def test_tokenize_lazy_bodies(s, expected):
+    assert list(lexer.tokenize(s, lazy_bodies=True)) == expected
+    stream = _TrickleStream(s, 2)
+    assert list(lexer.tokenize(stream, lazy_bodies=True)) == expected
+
+
+def test_stream_binary():
+    stream = io.BytesIO(u"SELECT 'й';".encode('cp1251'))
+    tokens = list(lexer.tokenize(stream, 'cp1251'))
+    assert tokens[2] == (T.String.Single, u"'й'")
+
+
+def test_tokenize_columnar(load_file):
+    sql = load_file('function_psql.sql')
+    columns = lexer.tokenize_columnar(sql)
+    assert list(columns) == list(lexer.tokenize(sql))
+    assert columns.ttypes.typecode == 'H'
+    assert columns.starts.typecode == columns.ends.typecode == 'I'
+    assert columns.starts[0] == 0 and columns.ends[-1] == len(sql)
+    assert list(columns.starts[1:]) == list(columns.ends[:-1])
+
+    dml = columns.type_id(T.Keyword.DML)
+    idx = columns.ttypes.index(dml)
+    assert columns.value(idx).upper() == 'SELECT'
+    assert columns.types[columns.ttypes[idx]] is T.Keyword.DML
+
+
+def test_scan(load_file):
+    sql = load_file('function_psql.sql') + u' {}'
+    found = []
+    lexer.scan(sql, lambda *token: found.append(token))
+    assert [(ttype, sql[start:end]) for ttype, start, end in found] \
+        == list(lexer.tokenize(sql))
+    assert found[-1] == (T.Error, len(sql) - 2, len(sql))
+
+
+def test_tokenize_columnar_empty():
+    columns = lexer.tokenize_columnar('')
+    assert len(columns) == 0
+    assert list(columns) == []
+
+
+def _columns(columns):
+    return (list(columns.ttypes), list(columns.starts), list(columns.ends),
+            columns.reaches)
+
+
+@pytest.mark.parametrize('start, end, new_text', [
+    (0, 0, 'x'), (-1, -1, '\'\n'), (2000, 2001, ''), (2000, 2000, '/*'),
+    (3000, 3010, "'a'"), (3000, 3000, '"'), (4000, 4000, '`x`\n('),
+])
+def test_retokenize(load_file, start, end, new_text):
+    sql = load_file('function_psql.sql') * 4
+    start, end = start % len(sql), end % len(sql)
+    columns = lexer.tokenize_columnar(sql)
+    result = lexer.retokenize(columns, start, end, new_text)
+    expected = lexer.tokenize_columnar(sql[:start] + new_text + sql[end:])
+    assert result.text == expected.text
+    assert _columns(result) == _columns(expected)
+    assert _columns(columns) == _columns(lexer.tokenize_columnar(sql))
+
+
+def test_retokenize_words():
+    sql = 'select a from t left' + ' ' * 2000 + 'outer' + ' ' * 2000 + 'x'
+    columns = lexer.retokenize(lexer.tokenize_columnar(sql),
+                               len(sql) - 1, len(sql), 'join b')
+    assert columns[8] == (T.Keyword, sql[16:-1] + 'join')
+
+
+def test_retokenize_far_reaching_token():
+    # The opening bracket becomes part of a name once it is closed.
+    sql = '[x' + ' y' * 2000
+    columns = lexer.retokenize(lexer.tokenize_columnar(sql), 4002, 4002, ']')
+    assert columns[0] == (T.Name, '[x' + ' y' * 2000 + ']')
+    assert len(columns) == 1
+
+
+@pytest.mark.parametrize('s', [
+    "'a''b' x", "'a\\'b' x", "'\\\\\\\\' x", "'\\\\\\'' x", "'' ''",
+    '"a\\"b" x', '"ab\n" x', '"" x', '"\\"x"',
+    '`a``b` x', '``',
+])
+def test_tokenize_literal_scanner(s):
+    assert list(lexer.tokenize(s)) == list(_tokenize_rule_by_rule(s))
+    assert list(lexer.tokenize(s + s)) == list(_tokenize_rule_by_rule(s + s))
+
+
+@pytest.mark.parametrize('s, expected', [
+    ("'abc", [(T.Error, "'abc")]),
+    ("'a''", [(T.String.Single, "'a'"), (T.Error, "'")]),
+    ("'a\\'", [(T.String.Single, "'a\\'")]),
+    ("'C:\\'; x", [(T.String.Single, "'C:\\'"), (T.Punctuation, ';'),
+                   (T.Whitespace, ' '), (T.Name, 'x')]),
+    ("'it''s' 'x;\n y", [(T.String.Single, "'it''s'"), (T.Whitespace, ' '),
+                         (T.Error, "'x;\n y")]),
+    ("'a\\\\'b' x", [(T.String.Single, "'a\\\\'"), (T.Name, 'b'),
+                     (T.Error, "' x")]),
+    ('"a', [(T.Error, '"a')]),
+    ('"\\"', [(T.Error, '"\\"')]),
+    ('"a\nb" x', [(T.Error, '"a'), (T.Newline, '\n'), (T.Name, 'b'),
+                  (T.Error, '" x')]),
+    ('"abc\r\nx', [(T.Error, '"abc'), (T.Newline, '\r\n'), (T.Name, 'x')]),
+    ('"abc\rx', [(T.Error, '"abc'), (T.Newline, '\r'), (T.Name, 'x')]),
+    ('`a', [(T.Error, '`a')]),
+    ('`a``', [(T.Name, '`a`'), (T.Error, '`')]),
+    ("x /* unterminated 'comment\n*", [
+        (T.Name, 'x'), (T.Whitespace, ' '),
+        (T.Error, "/* unterminated 'comment\n*")]),
+])
+def test_tokenize_unterminated_literal(s, expected):
+    assert list(lexer.tokenize(s)) == expected
+
+
+@pytest.mark.parametrize('make, ttype', [
+    (lambda n: '/* ' * n, T.Error),
+    (lambda n: '"\\' * n, T.Error),
+    (lambda n: "x '" + "\\'" * n, T.String.Single),
+    (lambda n: "x '" + "\\'" * n + '\\' * n, T.Error),
+    (lambda n: '`' + ' /* ' * n, T.Error),
+])
+def test_tokenize_unterminated_literal_runtime(make, ttype):
+    # Each opening quote or comment used to rescan the input up to its end,
+    # so the time grew with the square of the length of inputs like these.
+    def run(n):
+        s = make(n)
+        times = []
+        for _ in range(3):
+            start = timeit.default_timer()
+            tokens = list(lexer.tokenize(s))
+            times.append(timeit.default_timer() - start)
+        assert tokens[-1][0] is ttype
+        return min(times)
+    # 8 times the input should take about 8 times as long, not 64 times.
+    assert run(320000) < 32 * run(40000)
+
+
+def test_tokenize_long_literal():
+    body = '{"key": [1, 2, "va\\\\lue"]}' * 100000
+    tokens = list(lexer.tokenize("insert into t values ('{0}')".format(body)))
+    assert tokens[-2] == (T.String.Single, "'{0}'".format(body))
+
+
+def test_lexer_keywords():
+    lex = lexer.Lexer(keywords={'frob': T.Keyword.DML, 'SELECT': T.Name})
+    assert list(lex.get_tokens('Select frob foo')) == [
+        (T.Name, 'Select'), (T.Whitespace, ' '), (T.Keyword.DML, 'frob'),
+        (T.Whitespace, ' '), (T.Name, 'foo')]
+    # Other lexers aren't affected
+    assert list(lexer.tokenize('select frob'))[-1] == (T.Name, 'frob')
+    lex = lexer.Lexer('druid', {'frob': T.Keyword})
+    assert list(lex.get_tokens('frob granularity', lazy_bodies=True)) == [
+        (T.Keyword, 'frob'), (T.Whitespace, ' '), (T.Keyword, 'granularity')]
+
+
+def test_lexer_keywords_own_rules():
+    lex = lexer.Lexer(keywords={'case': T.Name, 'join': T.Name,
+                                'not null': T.Keyword.DML})
+    tokens = [token for token in lex.get_tokens('case not  null join in')
+              if token[0] is not T.Whitespace]
+    assert tokens == [(T.Name, 'case'), (T.Keyword.DML, 'not  null'),
+                      (T.Name, 'join'), (T.Keyword, 'in')]
+    assert list(lex.get_tokens('left join')) == [(T.Keyword, 'left join')]
+
+
+def test_lexer_get_tokens_on_class():
+    assert list(lexer.Lexer.get_tokens('select 1')) == [
+        (T.Keyword.DML, 'select'), (T.Whitespace, ' '),
+        (T.Number.Integer, '1')]
+
+
+def test_lexer_keywords_share_scanners():
+    lex = lexer.Lexer(keywords={'frob': T.Keyword})
+    list(lex.get_tokens('select frob'))
+    base = lexer._get_dispatch()
+    assert lex._get_dispatch()['s'][0] is base['s'][0]
+
+
+def test_lexer_keywords_lazy_bodies():
+    lex = lexer.Lexer(keywords={'frob': T.Keyword.DML})
+    stack = sqlparse.engine.FilterStack(lexer=lex)
+    stack.enable_lazy_bodies()
+    stmt, = stack.run('select $$frob$$')
+    body = stmt.tokens[-1]
+    assert isinstance(body, sql.DollarQuoted)
+    assert body.tokens[1].ttype is T.Keyword.DML
+
+
+def test_lexer_dump_modes():
+    lex = lexer.Lexer(dump_modes=['delimiter'])
+    assert list(lex.get_tokens('delimiter $$\nselect 1;$$')) == [
+        (T.Keyword.Command, 'delimiter $$'), (T.Newline, '\n'),
+        (T.Keyword.DML, 'select'), (T.Whitespace, ' '),
+        (T.Number.Integer, '1'), (T.Punctuation, ';'),
+        (T.Punctuation, '$$')]
+    lex = pickle.loads(pickle.dumps(lex))
+    assert lex.dump_modes == frozenset(['delimiter'])
+    with pytest.raises(SQLParseError):
+        lexer.Lexer(dump_modes=['pg_dump'])